@@ -1,33 +1,51 @@
 # Import libraries
 # import os
 import json
-import requests
+import hashlib
 
 import pandas as pd
 import numpy as np
 from datetime import datetime, date, timedelta
-import math
 
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 import dash
-from dash import Dash, dcc, html, Input, Output, State, ctx, dash_table
+from dash import Dash, dcc, html, Input, Output, State, ClientsideFunction, ctx, dash_table
 from dash.exceptions import PreventUpdate
 from dash.dash_table.Format import Format, Scheme, Symbol
 
-# Data preprocessing function
-import data_preprocessing
+# Sources of the data files
+import data_sources
+# Snapshots of the preprocessed data
+import data_snapshot
+# Server-side store of the callbacks' results
+import data_store
+# Index of periods for date range aggregates
+import period_index
+# Index of the product hierarchy for the menu
+import hierarchy_index
+# Aggregates of the dashboard for the selected filters
+import query_engine
 # Functions for plots creation
 import plot_functions
 
 # Load and preprocess the data
-PATH = 'https://raw.githubusercontent.com/GhostOfMadness/dash-groceries-and-household-items-exp/main/data/'
+data_source = data_sources.get_data_source()
+# Large results of callbacks are kept on the server, dcc.Store components get only their keys
+store = data_store.get_data_store()
+# Keys of the prepared slices of tables by the filter values
+query_cache = data_store.get_query_cache(store)
 
-df = pd.read_csv(PATH + 'Products.csv', delimiter=';')
-preprocessing = data_preprocessing.data_preprocessing
-subcat_cat, prod_subcat, cost, quantity, cost_others, quantity_others, period_len_df = preprocessing(df)
+csv_content = data_source.read_bytes('Products.csv')
+subcat_cat, prod_subcat, cost, quantity, cost_others, quantity_others, period_len_df = \
+    data_snapshot.load_tables(csv_content)
+# Version of the data and the preprocessing code
+DATA_VERSION = data_snapshot.snapshot_key(csv_content)
+
+# Prefix sums of the tables over periods (columns are in the same order in the translated tables)
+PERIOD_INDEX = period_index.PeriodIndex(cost, quantity, period_len_df)
 
 # List of dates that cannot be selected as a start or an end
 disabled_days = [
@@ -39,8 +57,67 @@ disabled_days = [
 ]
 
 # Download dictionaries with labels and items values
-labels_file = requests.get(PATH + 'labels_vocabulary.txt').text.split('\n')
-items_file = requests.get(PATH + 'items_vocabulary.txt').text.split('\n')
+labels_file = data_source.read_text('labels_vocabulary.txt').split('\n')
+items_file = data_source.read_text('items_vocabulary.txt').split('\n')
+
+# Languages of the app
+LANGUAGES = ['English', 'Русский']
+
+# Create dictionaries with labels and items values for the language
+def create_dictionaries(lang):
+    lang_num = 1 if lang == 'English' else 2
+    labels_dict = {}
+    for line in labels_file[:-1]:
+        split_line = line.strip().split('*')
+        labels_dict[split_line[0]] = split_line[lang_num]
+    items_dict = {}
+    for line in items_file[:-1]:
+        split_line = line.strip().split('*')
+        items_dict[split_line[0]] = split_line[lang_num]
+    dictionaries = {
+        'labels' : labels_dict,
+        'items' : items_dict
+    }
+    return dictionaries
+
+# Translate items' names in the tables and convert them into JSON
+def translate_datasets(items_dict):
+    period_len_df_copy = period_len_df.copy()
+    cost_copy = cost.copy()
+    cost_copy.columns = [items_dict[col] for col in cost.columns]
+    quantity_copy = quantity.copy()
+    quantity_copy.columns = [items_dict[col] for col in quantity.columns]
+    prod_subcat_copy = prod_subcat.copy()
+    prod_subcat_copy.index = [items_dict[idx] for idx in prod_subcat.index]
+    prod_subcat_copy['subcategory'] = prod_subcat_copy['subcategory'].apply(lambda x: items_dict[x])
+    subcat_cat_copy = subcat_cat.copy()
+    subcat_cat_copy.index = [items_dict[idx] for idx in subcat_cat.index]
+    subcat_cat_copy['category'] = subcat_cat_copy['category'].apply(lambda x: items_dict[x])
+    cost_others_copy = cost_others.copy()
+    cost_others_copy.columns = [items_dict[col] for col in cost_others.columns]
+    quantity_others_copy = quantity_others.copy()
+    quantity_others_copy.columns = [items_dict[col] for col in quantity_others.columns]
+    datasets = {
+        'period_len_df' : period_len_df_copy.to_json(date_format='epoch', orient='split'),
+        'cost' : cost_copy.to_json(date_format='epoch', orient='split'),
+        'quantity' : quantity_copy.to_json(date_format='epoch', orient='split'),
+        'prod_subcat' : prod_subcat_copy.to_json(date_format='iso', orient='split'),
+        'subcat_cat' : subcat_cat_copy.to_json(date_format='iso', orient='split'),
+        'cost_others' : cost_others_copy.to_json(date_format='epoch', orient='split'),
+        'quantity_others' : quantity_others_copy.to_json(date_format='epoch', orient='split')
+    }
+    return json.dumps(datasets)
+
+# Dictionaries and translated tables are the same for all sessions,
+# so they are created once for each language (tables are pinned in the store, the dict keeps their keys)
+DICTIONARIES = {lang : json.dumps(create_dictionaries(lang)) for lang in LANGUAGES}
+TRANSLATED_TABLES = {
+    lang : store.put(translate_datasets(create_dictionaries(lang)['items']), pin=True) for lang in LANGUAGES
+}
+HIERARCHY_INDEXES = {
+    lang : hierarchy_index.HierarchyIndex(
+        cost.columns, prod_subcat, subcat_cat, create_dictionaries(lang)['items']) for lang in LANGUAGES
+}
 
 # Create app layout
 app = Dash(__name__, eager_loading=True)
@@ -69,8 +146,8 @@ app.layout = html.Div(
                         html.Div(
                             [
                                 dcc.Dropdown(
-                                    ['English', 'Русский'],
-                                    'English',
+                                    LANGUAGES,
+                                    LANGUAGES[0],
                                     clearable=False,
                                     id='language-selector'
                                     ),
@@ -129,6 +206,7 @@ app.layout = html.Div(
                         ),
                         html.Div(id='err'),
                         dcc.Store(id='tables-storage', storage_type='session'),
+                        dcc.Store(id='storage-expired', storage_type='memory'),
                     ], id='menu-container', className='pretty-container'
                 ),
                 html.Div(
@@ -238,7 +316,10 @@ app.layout = html.Div(
                                         html.Div(id='graph-1-help-container'),
                                     ], className='graph-title-container'
                                 ),
-                                dcc.Graph(id='graph-1', config={'displayModeBar' : False})
+                                dcc.Graph(id='graph-1', config={'displayModeBar' : False}),
+                                # key of the values and the store kind shown by the graph-1
+                                # (kept in memory only, as the figure itself)
+                                dcc.Store(id='graph-1-key', storage_type='memory')
                             ], id='graph-1-container', className='pretty-container'
                         )
                     ], id='first-row-right-side-container'
@@ -289,6 +370,9 @@ app.layout = html.Div(
                         html.Div(
                             [
                                 dcc.Store(id='sunburst-data-storage', storage_type='session'),
+                                # figures of the graph-3 and the graph-4 with the data for the synchronization
+                                dcc.Store(id='graph-3-figure', storage_type='memory'),
+                                dcc.Store(id='graph-4-figure', storage_type='memory'),
                                 dcc.Graph(id='graph-3', config={'displayModeBar' : False}),
                                 dcc.Graph(id='graph-4', config={'displayModeBar' : False})
                             ], id='plot-3-4-container'
@@ -332,6 +416,8 @@ app.layout = html.Div(
                         html.Div(
                             [
                                 dcc.Store(id='graph-5-data', storage_type='session'),
+                                # figure of the graph-5 without the highlight of the hovered period
+                                dcc.Store(id='graph-5-figure', storage_type='memory'),
                                 html.Div(
                                     [
                                         html.Div(id='graph-5-title', className='graph-name'),
@@ -356,6 +442,8 @@ app.layout = html.Div(
                         html.Div(
                             [
                                 dcc.Store(id='graph-6-data', storage_type='session'),
+                                # figure of the graph-6 without the highlight of the hovered period
+                                dcc.Store(id='graph-6-figure', storage_type='memory'),
                                 html.Div(
                                     [
                                         html.Div(id='graph-6-title', className='graph-name'),
@@ -529,60 +617,62 @@ def create_tooltip(n_clicks, title, items_list, add_style={}):
     else:
         return None
 
+# Get the data of a storage by its key. If the data has been removed from the store
+# (e.g. after a restart of the server), the update is skipped until the storage is updated
+# and the query's result is dropped from the cache, so it is recomputed by the next click on the submit button.
+# The key is the hash of the content, so the decoded data is cached by the store
+# (a copy of the dictionary is returned, because callbacks can add values to it)
+def decode_storage(key):
+    payload = store.get(key)
+    if payload is None:
+        query_cache.discard(key)
+        raise PreventUpdate
+    return store.decoded.get(('storage', key), payload, json.loads)
+
+def load_storage(key):
+    return dict(decode_storage(key))
+
+# Read a table from the storage's data. Strings of the cached storages are the same objects,
+# so their hashes are computed once and the table is parsed once per worker.
+# Returned tables are shared between callbacks and must not be changed in place.
+def read_table(table_json):
+    return store.decoded.get(('table', table_json), table_json, parse_table)
+
+def parse_table(table_json):
+    return pd.read_json(table_json, orient='split')
+
+# Query engines for the translated tables of each language
+def create_query_engine(lang):
+    datasets = load_storage(TRANSLATED_TABLES[lang])
+    return query_engine.QueryEngine(
+        PERIOD_INDEX,
+        read_table(datasets['cost']),
+        read_table(datasets['quantity']),
+        read_table(datasets['cost_others']),
+        read_table(datasets['quantity_others']),
+        read_table(datasets['prod_subcat']),
+        read_table(datasets['subcat_cat']),
+        create_dictionaries(lang)['items']
+    )
+
+QUERY_ENGINES = {lang : create_query_engine(lang) for lang in LANGUAGES}
+
 # Selected language -> dictionaries
 @app.callback(
     Output('dictionaries', 'data'),
     Input('language-selector', 'value')
 )
 def update_dictionaries(lang):
-    lang_num = 1 if lang == 'English' else 2
-    labels_dict = {}
-    for line in labels_file[:-1]:
-        split_line = line.strip().split('*')
-        labels_dict[split_line[0]] = split_line[lang_num]
-    items_dict = {}
-    for line in items_file[:-1]:
-        split_line = line.strip().split('*')
-        items_dict[split_line[0]] = split_line[lang_num]
-    dictionaries = {
-        'labels' : labels_dict,
-        'items' : items_dict
-    }
-    return json.dumps(dictionaries)
+    return DICTIONARIES[lang]
 
 # Dictionaries -> translated tables
 @app.callback(
     Output('translated-tables', 'data'),
-    Input('dictionaries', 'data')
+    Input('dictionaries', 'data'),
+    State('language-selector', 'value')
 )
-def translate_tables(dicts):
-    dictionaries = json.loads(dicts)
-    items_dict = dictionaries['items']
-    period_len_df_copy = period_len_df.copy()
-    cost_copy = cost.copy()
-    cost_copy.columns = [items_dict[col] for col in cost.columns]
-    quantity_copy = quantity.copy()
-    quantity_copy.columns = [items_dict[col] for col in quantity.columns]
-    prod_subcat_copy = prod_subcat.copy()
-    prod_subcat_copy.index = [items_dict[idx] for idx in prod_subcat.index]
-    prod_subcat_copy['subcategory'] = prod_subcat_copy['subcategory'].apply(lambda x: items_dict[x])
-    subcat_cat_copy = subcat_cat.copy()
-    subcat_cat_copy.index = [items_dict[idx] for idx in subcat_cat.index]
-    subcat_cat_copy['category'] = subcat_cat_copy['category'].apply(lambda x: items_dict[x])
-    cost_others_copy = cost_others.copy()
-    cost_others_copy.columns = [items_dict[col] for col in cost_others.columns]
-    quantity_others_copy = quantity_others.copy()
-    quantity_others_copy.columns = [items_dict[col] for col in quantity_others.columns]
-    datasets = {
-        'period_len_df' : period_len_df_copy.to_json(date_format='epoch', orient='split'),
-        'cost' : cost_copy.to_json(date_format='epoch', orient='split'),
-        'quantity' : quantity_copy.to_json(date_format='epoch', orient='split'),
-        'prod_subcat' : prod_subcat_copy.to_json(date_format='iso', orient='split'),
-        'subcat_cat' : subcat_cat_copy.to_json(date_format='iso', orient='split'),
-        'cost_others' : cost_others_copy.to_json(date_format='epoch', orient='split'),
-        'quantity_others' : quantity_others_copy.to_json(date_format='epoch', orient='split')
-    }
-    return json.dumps(datasets)
+def translate_tables(dicts, lang):
+    return TRANSLATED_TABLES[lang]
 
 # Dictionaries -> translated labels (that are not depend on any other callbacks)
 @app.callback(
@@ -735,6 +825,14 @@ def create_option(label, disabled=False, color='#000000'):
         'disabled' : disabled
     }
 
+# Code of the store kind value for the period index
+def store_kind_code(sk_value, labels_dict):
+    if sk_value == labels_dict['store_kind_option_hyper']:
+        return 'hyper'
+    elif sk_value == labels_dict['store_kind_option_super']:
+        return 'super'
+    return 'all'
+
 # Start date, end date -> store kind options, store kind value
 @app.callback(
     Output('store-kind', 'options'),
@@ -748,16 +846,15 @@ def update_store_kind(start_date, end_date, dicts):
     labels_dict = dictionaries['labels']
     start = datetime.strptime(start_date, '%Y-%m-%d')
     end = datetime.strptime(end_date, '%Y-%m-%d')
-    mask = (period_len_df.index <= end) & (period_len_df.index >= start)
-    period_len_dff = period_len_df[mask]
+    start_pos, end_pos = PERIOD_INDEX.bounds(start, end)
     store_kind_options = [
         create_option(labels_dict['store_kind_option_all']),
         create_option(labels_dict['store_kind_option_hyper']),
         create_option(labels_dict['store_kind_option_super'])
     ]
     value = store_kind_options[0]['value']
-    if period_len_dff.shape[0] == 1:
-        if period_len_dff[0].values[0] == 0:
+    if end_pos - start_pos == 1:
+        if PERIOD_INDEX.lengths[start_pos] == 0:
             store_kind_options = [
                 create_option(labels_dict['store_kind_option_all'], disabled=True, color='#B1B1B0'),
                 create_option(labels_dict['store_kind_option_hyper']),
@@ -771,7 +868,7 @@ def update_store_kind(start_date, end_date, dicts):
                 create_option(labels_dict['store_kind_option_super'])
             ]
             value = store_kind_options[2]['value']
-    elif period_len_dff.shape[0] == 0:
+    elif end_pos - start_pos == 0:
         store_kind_options = [
             create_option(labels_dict['store_kind_option_all'], disabled=True, color='#B1B1B0'),
             create_option(labels_dict['store_kind_option_hyper'], disabled=True, color='#B1B1B0'),
@@ -779,31 +876,21 @@ def update_store_kind(start_date, end_date, dicts):
         ]
     return store_kind_options, value
 
-# Store kind value -> list of available items
+# Store kind value -> list of available items (their codes in the hierarchy index)
 @app.callback(
     Output('menu-working-table', 'data'),
     Input('store-kind', 'value'),
     State('date-picker-range', 'start_date'),
     State('date-picker-range', 'end_date'),
-    State('dictionaries', 'data'),
-    State('translated-tables', 'data')
+    State('dictionaries', 'data')
 )
-def update_current_table_after_sk(store_kind_value, start_date, end_date, dicts, ts_tables):
+def update_current_table_after_sk(store_kind_value, start_date, end_date, dicts):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    datasets = json.loads(ts_tables)
-    ts_cost = pd.read_json(datasets['cost'], orient='split')
     start = datetime.strptime(start_date, '%Y-%m-%d')
     end = datetime.strptime(end_date, '%Y-%m-%d')
-    mask = (period_len_df.index <= end) & (period_len_df.index >= start)
-    dates = period_len_df[mask]
-    if store_kind_value == labels_dict['store_kind_option_hyper']:
-        dates = dates[dates[0] == 0]
-    elif store_kind_value == labels_dict['store_kind_option_super']:
-        dates = dates[dates[0] != 0]
-    items = ts_cost.loc[dates.index]
-    items_values = items.replace(0, np.nan).dropna(axis=1, how='all').columns
-    return json.dumps(items_values.tolist())
+    available = PERIOD_INDEX.available_items(start, end, store_kind_code(store_kind_value, labels_dict))
+    return json.dumps(np.flatnonzero(available).tolist())
 
 # List of available items -> product type options, product type value
 @app.callback(
@@ -811,24 +898,20 @@ def update_current_table_after_sk(store_kind_value, start_date, end_date, dicts,
     Output('product-type', 'value'),
     Input('menu-working-table', 'data'),
     State('dictionaries', 'data'),
-    State('translated-tables', 'data')
+    State('language-selector', 'value')
 )
-def update_product_type(jsonified_data, dicts, ts_tables):
-    items_values = json.loads(jsonified_data)
+def update_product_type(jsonified_data, dicts, lang):
+    items_codes = json.loads(jsonified_data)
     dictionaries = json.loads(dicts)
-    datasets = json.loads(ts_tables)
     labels_dict = dictionaries['labels']
-    ts_prod_subcat = pd.read_json(datasets['prod_subcat'], orient='split')
-    ts_subcat_cat = pd.read_json(datasets['subcat_cat'], orient='split')
+    index = HIERARCHY_INDEXES[lang]
     product_type_options = [
         create_option(labels_dict['product_type_option_all']),
         create_option(labels_dict['product_type_option_food']),
         create_option(labels_dict['product_type_option_goods'])
     ]
     value = product_type_options[0]['value']
-    unique_categories = ts_subcat_cat.loc[
-        ts_prod_subcat.loc[items_values].subcategory.unique()
-        ].category.unique()
+    unique_categories = index.items_types(index.items_mask(items_codes))
     if len(unique_categories) == 1:
         if unique_categories[0] == labels_dict['product_type_option_food']:
             product_type_options = [
@@ -858,21 +941,18 @@ def update_product_type(jsonified_data, dicts, ts_tables):
     Input('product-type', 'value'),
     State('menu-working-table', 'data'),
     State('dictionaries', 'data'),
-    State('translated-tables', 'data')
+    State('language-selector', 'value')
 )
-def update_categories(type_value, jsonified_data, dicts, ts_tables):
-    items_values = json.loads(jsonified_data)
+def update_categories(type_value, jsonified_data, dicts, lang):
+    items_codes = json.loads(jsonified_data)
     dictionaries = json.loads(dicts)
-    datasets = json.loads(ts_tables)
     labels_dict = dictionaries['labels']
     items_dict = dictionaries['items']
-    ts_prod_subcat = pd.read_json(datasets['prod_subcat'], orient='split')
-    ts_subcat_cat = pd.read_json(datasets['subcat_cat'], orient='split')
+    index = HIERARCHY_INDEXES[lang]
+    mask = index.items_mask(items_codes)
     if type_value != labels_dict['product_type_option_all']:
-        items_values = [
-            i for i in items_values if ts_subcat_cat.loc[ts_prod_subcat.loc[i].subcategory].category == type_value
-        ]
-    categories = np.sort(ts_prod_subcat.loc[items_values].subcategory.unique()).tolist()
+        mask &= index.type_mask(type_value)
+    categories = np.sort(index.items_subcategories(mask)).tolist()
     if len(categories) > 1:
         categories.insert(0, items_dict['Все'])
     return categories
@@ -902,25 +982,20 @@ def correct_category_value(category_value, product_value, dicts):
     State('menu-working-table', 'data'),
     State('product-type', 'value'),
     State('dictionaries', 'data'),
-    State('translated-tables', 'data')
+    State('language-selector', 'value')
 )
-def update_items(category_value, jsonified_data, type_value, dicts, ts_tables):
-    items_options = json.loads(jsonified_data)
+def update_items(category_value, jsonified_data, type_value, dicts, lang):
+    items_codes = json.loads(jsonified_data)
     dictionaries = json.loads(dicts)
-    datasets = json.loads(ts_tables)
     items_dict = dictionaries['items']
-    ts_prod_subcat = pd.read_json(datasets['prod_subcat'], orient='split')
-    ts_subcat_cat = pd.read_json(datasets['subcat_cat'], orient='split')
+    index = HIERARCHY_INDEXES[lang]
+    mask = index.items_mask(items_codes)
     if len(category_value) >= 1 and category_value[0] != items_dict['Все']:
-        items_options = [
-            i for i in items_options if ts_prod_subcat.loc[i, 'subcategory'] in category_value
-        ]
+        mask &= index.subcategories_mask(category_value)
     else:
         if type_value != items_dict['Все']:
-            items_options = [
-                i for i in items_options if ts_subcat_cat.loc[ts_prod_subcat.loc[i, 'subcategory'], 'category'] == type_value
-            ]
-    items_options = sorted(items_options)
+            mask &= index.type_mask(type_value)
+    items_options = sorted(index.items[mask].tolist())
     if len(items_options) > 1:
         items_options.insert(0, items_dict['Все'])
     return items_options
@@ -943,22 +1018,46 @@ def correct_item_value(item_value, category_value, dicts):
             item_value.remove(items_dict['Все'])
         return item_value
 
-# Click on the submit button, selected language -> the error message
-# (if the date range is incorrect or no items are selected)
+# Storages' keys, clicks on the others table button -> whether the data of any storage has been removed from the store
+# (the storages can't be updated by the callbacks that read them, so the user is asked to click the submit button)
+@app.callback(
+    Output('storage-expired', 'data'),
+    Input('tables-storage', 'data'),
+    Input('sunburst-data-storage', 'data'),
+    Input('others-table-storage', 'data'),
+    Input('graph-5-data', 'data'),
+    Input('graph-6-data', 'data'),
+    Input('others-table-button', 'n_clicks'),
+    State('storage-expired', 'data')
+)
+def check_storages(tables, sunburst_tables, others_table, graph_5_tables, graph_6_tables, n_clicks, expired):
+    missing = [key for key in (tables, sunburst_tables, others_table, graph_5_tables, graph_6_tables)
+               if key is not None and store.get(key) is None]
+    for key in missing:
+        query_cache.discard(key)
+    if bool(missing) == bool(expired):
+        raise PreventUpdate
+    return bool(missing)
+
+# Click on the submit button, selected language, expired storages -> the error message
+# (if the date range is incorrect, no items are selected or the data has to be updated)
 @app.callback(
     Output('err', 'children'),
     Input('submit-button', 'n_clicks'),
     Input('language-selector', 'value'),
+    Input('storage-expired', 'data'),
     State('date-picker-range', 'start_date'),
     State('date-picker-range', 'end_date'),
     State('item-choose', 'value'),
     State('dictionaries', 'data')
 )
-def show_error_message(n_clicks, lang, start_date, end_date, items, dicts):
+def show_error_message(n_clicks, lang, expired, start_date, end_date, items, dicts):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
     comp_id = ctx.triggered_id
-    if comp_id == 'submit-button':
+    if comp_id == 'storage-expired':
+        return labels_dict['error_message_3'] if expired else ''
+    elif comp_id == 'submit-button':
         if n_clicks == 0:
             raise PreventUpdate
 
@@ -979,7 +1078,7 @@ def show_error_message(n_clicks, lang, start_date, end_date, items, dicts):
 def update_submit_n_clicks(ts_tables):
     return 0
 
-# Clicks on the submit button -> translated slices of tables
+# Clicks on the submit button -> aggregates for the selected filters
 @app.callback(
     Output('tables-storage', 'data'),
     Input('submit-button', 'n_clicks'),
@@ -989,95 +1088,79 @@ def update_submit_n_clicks(ts_tables):
     State('item-choose', 'value'),
     State('item-choose', 'options'),
     State('dictionaries', 'data'),
-    State('translated-tables', 'data')
+    State('language-selector', 'value')
 )
-def clean_data(n_clicks, start_date, end_date, sk_value, items_value, items_options, dicts, ts_tables):
+def clean_data(n_clicks, start_date, end_date, sk_value, items_value, items_options, dicts, lang):
     start = datetime.strptime(start_date, '%Y-%m-%d')
     end = datetime.strptime(end_date, '%Y-%m-%d')
     if n_clicks != 0 and (start > end or items_value == [] or items_value is None):
         raise PreventUpdate
 
     dictionaries = json.loads(dicts)
-    datasets = json.loads(ts_tables)
     labels_dict = dictionaries['labels']
     items_dict = dictionaries['items']
-    ts_cost = pd.read_json(datasets['cost'], orient='split')
-    ts_quantity = pd.read_json(datasets['quantity'], orient='split')
-    ts_prod_subcat = pd.read_json(datasets['prod_subcat'], orient='split')
-    ts_subcat_cat = pd.read_json(datasets['subcat_cat'], orient='split')
-    ts_cost_others = pd.read_json(datasets['cost_others'], orient='split')
-    ts_quantity_others = pd.read_json(datasets['quantity_others'], orient='split')
+    # normalized filter values: the range of periods, the store kind and the set of items
+    # (selected items are sorted like the options, so the result does not depend on the order of clicks).
+    # Before the first click all items are shown for the full date range.
     if n_clicks != 0:
-        mask = (period_len_df.index <= end) & (period_len_df.index >= start)
-        period_len_dff = period_len_df[mask]
-        if sk_value == labels_dict['store_kind_option_hyper']:
-            period_len_dff = period_len_dff[period_len_dff[0] == 0]
-        elif sk_value == labels_dict['store_kind_option_super']:
-            period_len_dff = period_len_dff[period_len_dff[0] != 0]
-        dates = period_len_dff.index
+        store_kind = store_kind_code(sk_value, labels_dict)
         if items_dict['Все'] in items_value:
             columns = [opt for opt in items_options if opt != items_dict['Все']]
         else:
-            columns = items_value
-        cost_cleaned = ts_cost.loc[dates, columns]
-        quantity_cleaned = ts_quantity.loc[dates, columns]
-        prod_subcat_cleaned = ts_prod_subcat.loc[columns]
-        subcat_cat_cleaned = ts_subcat_cat.loc[list(set(prod_subcat_cleaned.subcategory))]
-        datasets = {
-            'period_len_df' : period_len_dff.to_json(orient='split', date_format='epoch'),
-            'cost' : cost_cleaned.to_json(orient='split', date_format='epoch'),
-            'quantity' : quantity_cleaned.to_json(orient='split', date_format='epoch'),
-            'prod_subcat' : prod_subcat_cleaned.to_json(orient='split', date_format='iso'),
-            'subcat_cat' : subcat_cat_cleaned.to_json(orient='split', date_format='iso'),
+            columns = sorted(items_value)
+        codes = HIERARCHY_INDEXES[lang].codes(columns)
+        if len(codes) == 0:
+            raise PreventUpdate
+        params = (PERIOD_INDEX.bounds(start, end), store_kind, tuple(sorted(codes.tolist())), lang, DATA_VERSION)
+    else:
+        start, end = period_len_df.index[0], period_len_df.index[-1]
+        store_kind = 'all'
+        codes = np.arange(len(cost.columns))
+        params = ('all', lang, DATA_VERSION)
+    key = query_cache.get(params)
+    if key is not None:
+        return key
+
+    result = QUERY_ENGINES[lang].query(start, end, store_kind, codes)
+    if result is None:
+        raise PreventUpdate
+    datasets = {
+        'items' : json.dumps(sorted(int(code) for code in codes)),
+        'range' : json.dumps([str(d.date()) for d in result['range']]),
+        'aggregates' : json.dumps(result['aggregates']),
+        'by_period' : result['by_period'].to_json(orient='split', date_format='epoch'),
+        'scatter' : result['scatter'].to_json(orient='split', date_format='epoch'),
+        'by_item' : result['by_item'].to_json(orient='split', date_format='iso'),
+        'prod_subcat' : result['prod_subcat'].to_json(orient='split', date_format='iso'),
+        'subcat_cat' : result['subcat_cat'].to_json(orient='split', date_format='iso')
+    }
+    if 'others' in result:
+        others = {
+            name : json.dumps(value) for name, value in result['others'].items() if name != 'table'
         }
-        if items_dict['Остальные расходы'] in subcat_cat_cleaned.index:
-            cost_others_cleaned = ts_cost_others.loc[dates].replace(0, np.nan).dropna(axis=1, how='all')
-            cost_others_cleaned.fillna(0, inplace=True)
-            quantity_others_cleaned = ts_quantity_others.loc[dates, cost_others_cleaned.columns]
-            datasets['cost_others'] = cost_others_cleaned.to_json(orient='split', date_format='epoch')
-            datasets['quantity_others'] = quantity_others_cleaned.to_json(orient='split', date_format='epoch')
-    vol, pack = [], []
-    for pos in ts_cost.columns:
-        if np.all(ts_quantity[pos].astype('int') == ts_quantity[pos]) and pos not in items_dict['Мука']:
-            pack.append(pos)
-        else:
-            vol.append(pos)
-    datasets['kg_l'] = json.dumps(vol)
-    datasets['packs'] = json.dumps(pack)
-    return json.dumps(datasets)
-
-# Translated slices of tables -> aggregation values
+        others['table'] = result['others']['table'].to_json(orient='split', date_format='iso')
+        datasets['others'] = json.dumps(others)
+    key = store.put(json.dumps(datasets))
+    query_cache.put(params, key)
+    return key
+
+# Get the first and the last periods of the selected date range
+def selected_range(cleaned_datasets):
+    start, end = json.loads(cleaned_datasets['range'])
+    return pd.Timestamp(start), pd.Timestamp(end)
+
+# Aggregates for the selected filters -> aggregation values
 @app.callback(
     Output('total-items', 'children'),
     Output('total-days', 'children'),
     Output('rub-per-day', 'children'),
     Output('volume-per-day', 'children'),
-    Input('tables-storage', 'data'),
-    State('dictionaries', 'data'),
-    State('translated-tables', 'data')
+    Input('tables-storage', 'data')
 )
-def update_aggregation_values(jsonified_data, dicts, ts_tables):
-    full_datasets = json.loads(ts_tables)
-    slice_datasets = json.loads(jsonified_data)
-    dictionaries = json.loads(dicts)
-    period_len_df_slice = pd.read_json(slice_datasets['period_len_df'], orient='split')
-    cost_slice = pd.read_json(slice_datasets['cost'], orient='split')
-    quantity_slice = pd.read_json(slice_datasets['quantity'], orient='split')
-    quantity_full = pd.read_json(full_datasets['quantity'], orient='split')
-    items_dict = dictionaries['items']
-    items = len(cost_slice.columns)
-    days = int(period_len_df_slice[0].sum() + len(period_len_df_slice))
-    rub_per_day = round(cost_slice.sum().sum() / days, 2)
-    vol, pack = [], []
-    for item in quantity_slice.columns:
-        if np.all(quantity_full[item].astype('int') == quantity_full[item]) and item != items_dict['Мука']:
-            pack.append(item)
-        else:
-            vol.append(item)
-    vol_per_day = round(quantity_slice[vol].sum().sum() / days, 1)
-    pack_per_day = int(math.ceil(quantity_slice[pack].sum().sum() / days))
-    total_volume_per_day = f'{vol_per_day}/ {pack_per_day}'
-    return items, days, rub_per_day, total_volume_per_day
+def update_aggregation_values(jsonified_data):
+    aggregates = json.loads(load_storage(jsonified_data)['aggregates'])
+    total_volume_per_day = f'{aggregates["vol_per_day"]}/ {aggregates["pack_per_day"]}'
+    return aggregates['items'], aggregates['days'], aggregates['rub_per_day'], total_volume_per_day
 
 # Total items count -> total items count label
 @app.callback(
@@ -1117,29 +1200,33 @@ def set_total_days_label(value, dicts, lang):
     if lang == 'English':
         return labels_dict['total_days_label'] if value != 1 else 'Day'
 
-# Translated slices of tables -> graph-1 (total expenses by period)
+# Aggregates for the selected filters -> graph-1 (total expenses by period), key of the graph-1.
+# If the graph already shows the same items and the store kind, only the date range is updated.
 @app.callback(
     Output('graph-1', 'figure'),
+    Output('graph-1-key', 'data'),
     Input('tables-storage', 'data'),
-    State('translated-tables', 'data'),
+    State('graph-1-key', 'data'),
     State('dictionaries', 'data'),
     State('store-kind', 'value'),
     State('language-selector', 'value')
 )
-def update_figure_1(cleaned_ts_tables, ts_tables, dicts, sk_value, lang):
+def update_figure_1(cleaned_ts_tables, figure_key, dicts, sk_value, lang):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    full_datasets = json.loads(ts_tables)
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    full_ts_cost = pd.read_json(full_datasets['cost'], orient='split')
-    full_period_len_df = pd.read_json(full_datasets['period_len_df'], orient='split')
-    cleaned_ts_cost = pd.read_json(cleaned_datasets['cost'], orient='split')
-    start = cleaned_ts_cost.index[0]
-    end = cleaned_ts_cost.index[-1]
-    items_names = cleaned_ts_cost.columns
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    totals = read_table(cleaned_datasets['by_period'])[['total']].set_axis([0], axis=1)
+    start, end = selected_range(cleaned_datasets)
+    key = hashlib.sha256(
+        json.dumps([cleaned_datasets['items'], sk_value, lang, DATA_VERSION]).encode('utf-8')
+    ).hexdigest()[:32]
+    if key == figure_key:
+        return plot_functions.linear_graph_range_patch(
+            totals, period_len_df, start, end, start, end, sk_value, labels_dict, 'cost_count'
+            ), dash.no_update
     return plot_functions.linear_graph(
-        full_ts_cost, full_period_len_df, start, end, start, end, items_names, lang, sk_value, labels_dict, 'cost_count'
-        )
+        totals, period_len_df, start, end, start, end, lang, sk_value, labels_dict, 'cost_count'
+        ), key
 
 # Dictionaries -> increase clicks of the graph-1 help button on 2
 @app.callback(
@@ -1173,46 +1260,34 @@ def show_tooltip_graph_1(n_clicks, dicts):
 
     return create_tooltip(n_clicks, labels_dict['graph_1_help_title'], items_list, add_style=add_style)
 
-# Translated slices of tables -> data for sunburst plots
+# Aggregates for the selected filters -> data for sunburst plots
 @app.callback(
     Output('sunburst-data-storage', 'data'),
     Input('tables-storage', 'data'),
     State('dictionaries', 'data')
 )
 def create_sunburst_tables(cleaned_ts_tables, dicts):
-    cleaned_datasets = json.loads(cleaned_ts_tables)
+    cleaned_datasets = load_storage(cleaned_ts_tables)
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    cleaned_ts_cost = pd.read_json(cleaned_datasets['cost'], orient='split')
-    cleaned_ts_quantity = pd.read_json(cleaned_datasets['quantity'], orient='split')
-    cleaned_ts_prod_subcat = pd.read_json(cleaned_datasets['prod_subcat'], orient='split')
-    cleaned_ts_subcat_cat = pd.read_json(cleaned_datasets['subcat_cat'], orient='split')
-    items_kg_l = json.loads(cleaned_datasets['kg_l'])
-    items_packs = json.loads(cleaned_datasets['packs'])
-    sunburst_data_cost = plot_functions.sunburst_dataframe(
-        cleaned_ts_cost, cleaned_ts_quantity, cleaned_ts_cost.columns,
-        cleaned_ts_prod_subcat, cleaned_ts_subcat_cat,
-        labels_dict['total'], labels_dict['of_total_sum'], 'cost', labels_dict)
-    sunburst_data_kg_l = plot_functions.sunburst_dataframe(
-        cleaned_ts_cost, cleaned_ts_quantity, items_kg_l,
-        cleaned_ts_prod_subcat, cleaned_ts_subcat_cat,
-        labels_dict['total'], labels_dict['of_total_vol'], 'vol', labels_dict)
-    sunburst_data_packs = plot_functions.sunburst_dataframe(
-        cleaned_ts_cost, cleaned_ts_quantity, items_packs,
-        cleaned_ts_prod_subcat, cleaned_ts_subcat_cat,
-        labels_dict['total'], labels_dict['of_total_vol'], 'pack', labels_dict)
-    items_list = []
-    for idx in sunburst_data_cost.index:
-        if not idx in sunburst_data_cost['parent'].values:
-            items_list.append(idx)
-            items_list.append(sunburst_data_cost.loc[idx, 'showing_label'])
+    items_table = read_table(cleaned_datasets['by_item'])
+    cleaned_ts_prod_subcat = read_table(cleaned_datasets['prod_subcat'])
+    cleaned_ts_subcat_cat = read_table(cleaned_datasets['subcat_cat'])
+    sunburst_tables = plot_functions.sunburst_dataframes(
+        items_table, cleaned_ts_prod_subcat, cleaned_ts_subcat_cat, labels_dict['total'],
+        {'cost' : labels_dict['of_total_sum'], 'vol' : labels_dict['of_total_vol'], 'pack' : labels_dict['of_total_vol']},
+        labels_dict)
+    sunburst_data_cost = sunburst_tables['cost']
+    # leaves of the cost plot (labels without descendants in the tree index)
+    leaves = sunburst_data_cost[sunburst_data_cost['subtree_start'] == np.arange(len(sunburst_data_cost))]
+    items_list = [label for pair in zip(leaves.index, leaves['showing_label']) for label in pair]
     sunburst_data = {
         'cost' : sunburst_data_cost.to_json(orient='split', date_format='iso'),
-        'vol' : sunburst_data_kg_l.to_json(orient='split', date_format='iso'),
-        'pack' : sunburst_data_packs.to_json(orient='split', date_format='iso'),
+        'vol' : sunburst_tables['vol'].to_json(orient='split', date_format='iso'),
+        'pack' : sunburst_tables['pack'].to_json(orient='split', date_format='iso'),
         'items_list' : json.dumps(items_list)
     }
-    return json.dumps(sunburst_data)
+    return store.put(json.dumps(sunburst_data))
 
 # Data for sunburst plots -> graph-2 (items' cost shares)
 @app.callback(
@@ -1220,8 +1295,8 @@ def create_sunburst_tables(cleaned_ts_tables, dicts):
     Input('sunburst-data-storage', 'data')
 )
 def update_figure_2(sunburst_tables):
-    plot_tables = json.loads(sunburst_tables)
-    cost_plot_table = pd.read_json(plot_tables['cost'], orient='split')
+    plot_tables = load_storage(sunburst_tables)
+    cost_plot_table = read_table(plot_tables['cost'])
     return plot_functions.sunburst_plot_cost(cost_plot_table)
 
 # Dictionaries -> synchronization state options, synchronization state
@@ -1237,79 +1312,55 @@ def enable_synchronization(dicts):
     value = labels_dict['yes']
     return options, value
 
-# Data for sunburst plots, graph-2 clickData -> graph-3
+# Data for sunburst plots -> figure of the graph-3
 # (items' quantity shares (in kilograms or litres))
 @app.callback(
-    Output('graph-3', 'figure'),
+    Output('graph-3-figure', 'data'),
     Input('sunburst-data-storage', 'data'),
-    Input('graph-2', 'clickData'),
-    Input('sync-switch', 'value'),
     State('dictionaries', 'data')
 )
-def update_figure_3(sunburst_tables, click_data, sync_value, dicts):
+def update_figure_3(sunburst_tables, dicts):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    plot_tables = json.loads(sunburst_tables)
-    vol_plot_table = pd.read_json(plot_tables['vol'], orient='split')
+    plot_tables = load_storage(sunburst_tables)
+    vol_plot_table = read_table(plot_tables['vol'])
     items = json.loads(plot_tables['items_list'])
-    comp_id = ctx.triggered_id
-    if comp_id == 'sunburst-data-storage':
-        return plot_functions.sunburst_plot_quantity(vol_plot_table)
-    elif comp_id == 'sync-switch':
-        if sync_value == labels_dict['no']:
-            return plot_functions.sunburst_plot_quantity(vol_plot_table)
-        if sync_value == labels_dict['yes']:
-            if click_data:
-                return plot_functions.update_quantity_sunburst(
-                    vol_plot_table, click_data, items)
-            else:
-                return plot_functions.sunburst_plot_quantity(vol_plot_table)
-    elif comp_id == 'graph-2':
-        if click_data:
-            if sync_value == labels_dict['yes']:
-                return plot_functions.update_quantity_sunburst(
-                    vol_plot_table, click_data, items)
-            else:
-                raise PreventUpdate
-        else:
-            return plot_functions.sunburst_plot_quantity(vol_plot_table)
+    return plot_functions.sunburst_sync_data(vol_plot_table, items, labels_dict['yes'])
 
-# Data for sunburst plots, graph-2 clickData -> graph-4
+# Figure of the graph-3, graph-2 clickData, synchronization state -> graph-3
+# (the clicked label's subtree is shown on the client, see assets/sunburst_sync.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='sunburst', function_name='sync_quantity_plot'),
+    Output('graph-3', 'figure'),
+    Input('graph-3-figure', 'data'),
+    Input('graph-2', 'clickData'),
+    Input('sync-switch', 'value')
+)
+
+# Data for sunburst plots -> figure of the graph-4
 # (items' quantity shares (in packs))
 @app.callback(
-    Output('graph-4', 'figure'),
+    Output('graph-4-figure', 'data'),
     Input('sunburst-data-storage', 'data'),
-    Input('graph-2', 'clickData'),
-    Input('sync-switch', 'value'),
     State('dictionaries', 'data')
 )
-def update_figure_4(sunburst_tables, click_data, sync_value, dicts):
+def update_figure_4(sunburst_tables, dicts):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    plot_tables = json.loads(sunburst_tables)
-    pack_plot_table = pd.read_json(plot_tables['pack'], orient='split')
+    plot_tables = load_storage(sunburst_tables)
+    pack_plot_table = read_table(plot_tables['pack'])
     items = json.loads(plot_tables['items_list'])
-    comp_id = ctx.triggered_id
-    if comp_id == 'sunburst-data-storage':
-        return plot_functions.sunburst_plot_quantity(pack_plot_table)
-    elif comp_id == 'sync-switch':
-        if sync_value == labels_dict['no']:
-            return plot_functions.sunburst_plot_quantity(pack_plot_table)
-        if sync_value == labels_dict['yes']:
-            if click_data:
-                return plot_functions.update_quantity_sunburst(
-                    pack_plot_table, click_data, items)
-            else:
-                return plot_functions.sunburst_plot_quantity(pack_plot_table)
-    elif comp_id == 'graph-2':
-        if click_data:
-            if sync_value == labels_dict['yes']:
-                return plot_functions.update_quantity_sunburst(
-                    pack_plot_table, click_data, items)
-            else:
-                raise PreventUpdate
-        else:
-            return plot_functions.sunburst_plot_quantity(pack_plot_table)
+    return plot_functions.sunburst_sync_data(pack_plot_table, items, labels_dict['yes'])
+
+# Figure of the graph-4, graph-2 clickData, synchronization state -> graph-4
+# (the clicked label's subtree is shown on the client, see assets/sunburst_sync.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='sunburst', function_name='sync_quantity_plot'),
+    Output('graph-4', 'figure'),
+    Input('graph-4-figure', 'data'),
+    Input('graph-2', 'clickData'),
+    Input('sync-switch', 'value')
+)
 
 # Dictionaries -> increase clicks of the synchronization help button on 2
 @app.callback(
@@ -1386,51 +1437,27 @@ def show_tooltip_graph_2_3_4(n_clicks, dicts, lang):
     }
     return create_tooltip(n_clicks, labels_dict['graph_3_4_help_title'], items_list, add_style=add_style)
 
-# Translated slices of tables -> state of the other expenses table button
+# Aggregates for the selected filters -> state of the other expenses table button
 @app.callback(
     Output('others-table-button', 'disabled'),
     Input('tables-storage', 'data')
 )
 def on_off_others_table_button(cleaned_ts_tables):
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    return cleaned_datasets.get('cost_others', '') == ''
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    return 'others' not in cleaned_datasets
 
-# Translated slices of tables -> data for the other expenses table
+# Aggregates for the selected filters -> data for the other expenses table
 @app.callback(
     Output('others-table-storage', 'data'),
     Input('tables-storage', 'data'),
-    State('store-kind', 'value'),
-    State('dictionaries', 'data')
+    State('store-kind', 'value')
 )
-def create_others_table(cleaned_ts_tables, sk_value, dicts):
-    dictionaries = json.loads(dicts)
-    labels_dict = dictionaries['labels']
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    if cleaned_datasets.get('cost_others', '') != '':
-        cleaned_ts_cost_others = pd.read_json(cleaned_datasets['cost_others'], orient='split')
-        cleaned_ts_quantity_others = pd.read_json(cleaned_datasets['quantity_others'], orient='split')
-        cleaned_ts_period_df = pd.read_json(cleaned_datasets['period_len_df'], orient='split')
-        if sk_value == labels_dict['store_kind_option_all']:
-            others_table, hyper_part, super_part, all_part = plot_functions.create_full_table(
-                cleaned_ts_cost_others, cleaned_ts_quantity_others, cleaned_ts_period_df
-            )
-            others_table_data = {
-                'table' : others_table.to_json(orient='split', date_format='iso'),
-                'hyper_part' : json.dumps(hyper_part),
-                'super_part' : json.dumps(super_part),
-                'all_part' : json.dumps(all_part),
-                'sk_value' : json.dumps([sk_value])
-            }
-        else:
-            others_table, all_part = plot_functions.create_one_table(
-                cleaned_ts_cost_others, cleaned_ts_quantity_others
-            )
-            others_table_data = {
-                'table' : others_table.to_json(orient='split', date_format='iso'),
-                'all_part' : json.dumps(all_part),
-                'sk_value' : json.dumps([sk_value])
-            }
-        return json.dumps(others_table_data)
+def create_others_table(cleaned_ts_tables, sk_value):
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    if 'others' in cleaned_datasets:
+        others_table_data = json.loads(cleaned_datasets['others'])
+        others_table_data['sk_value'] = json.dumps([sk_value])
+        return store.put(json.dumps(others_table_data))
 
 # Data for the other expenses table -> zeroing clicks on the other expenses table button
 @app.callback(
@@ -1459,11 +1486,10 @@ def update_others_n_clicks(others_table):
 def change_style(n_clicks, others_table, cleaned_ts_tables, dicts):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    if cleaned_datasets.get('cost_others', '') != '':
-        cleaned_ts_cost_others = pd.read_json(cleaned_datasets['cost_others'], orient='split')
-        items_count = cleaned_ts_cost_others.shape[1]
-        others_table_data = json.loads(others_table)
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    if 'others' in cleaned_datasets:
+        others_table_data = load_storage(others_table)
+        items_count = read_table(others_table_data['table']).shape[0]
         sk_value = json.loads(others_table_data['sk_value'])[0]
     else:
         items_count = 0
@@ -1570,9 +1596,9 @@ def show_others_table(n_clicks, others_table, dicts):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
     if n_clicks % 2 != 0:
-        others_table_data = json.loads(others_table)
+        others_table_data = load_storage(others_table)
         sk_value = json.loads(others_table_data['sk_value'])[0]
-        show_table = pd.read_json(others_table_data['table'], orient='split')
+        show_table = read_table(others_table_data['table'])
         all_part = json.loads(others_table_data['all_part'])
         if sk_value == labels_dict['store_kind_option_all']:
             hyper_part = json.loads(others_table_data['hyper_part'])
@@ -1630,116 +1656,93 @@ def update_row_position(table_style):
     }
     return row_style
 
-# Translated slices of tables -> data for the graph-5 (items' number by period)
+# Aggregates for the selected filters -> data for the graph-5 (items' number by period)
 @app.callback(
     Output('graph-5-data', 'data'),
     Input('tables-storage', 'data'),
-    State('translated-tables', 'data'),
     State('store-kind', 'value')
 )
-def update_data_graph_5(cleaned_ts_tables, ts_tables, sk_value):
-    full_datasets = json.loads(ts_tables)
-    full_ts_cost = pd.read_json(full_datasets['cost'], orient='split')
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    cleaned_ts_cost = pd.read_json(cleaned_datasets['cost'], orient='split')
-    items_names = cleaned_ts_cost.columns
-    dff = full_ts_cost[items_names].apply(np.count_nonzero, axis=1).to_frame()
+def update_data_graph_5(cleaned_ts_tables, sk_value):
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    dff = read_table(cleaned_datasets['by_period'])[['items']].set_axis([0], axis=1)
     graph_data = {
         'to_plot' : dff.to_json(orient='split', date_format='epoch'),
         'sk_value' : json.dumps([sk_value])
     }
-    return json.dumps(graph_data)
+    return store.put(json.dumps(graph_data))
 
-# Data for the graph-5, graph-6 hoverData -> graph-5
+# Data for the graph-5 -> figure of the graph-5
 @app.callback(
-    Output('graph-5', 'figure'),
+    Output('graph-5-figure', 'data'),
     Input('graph-5-data', 'data'),
-    Input('graph-6', 'hoverData'),
     State('tables-storage', 'data'),
-    State('translated-tables', 'data'),
     State('dictionaries', 'data'),
     State('language-selector', 'value')
 )
-def update_graph_5(graph_tables, hover_data, cleaned_ts_tables, ts_tables, dicts, lang):
+def update_graph_5(graph_tables, cleaned_ts_tables, dicts, lang):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    full_datasets = json.loads(ts_tables)
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    graph_data = json.loads(graph_tables)
-    dff = pd.read_json(graph_data['to_plot'], orient='split')
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    graph_data = load_storage(graph_tables)
+    dff = read_table(graph_data['to_plot'])
     sk_value = json.loads(graph_data['sk_value'])[0]
-    full_period_len_df = pd.read_json(full_datasets['period_len_df'], orient='split')
-    cleaned_ts_cost = pd.read_json(cleaned_datasets['cost'], orient='split')
-    start = cleaned_ts_cost.index[0]
-    end = cleaned_ts_cost.index[-1]
-    items_names = cleaned_ts_cost.columns
-    comp_id = ctx.triggered_id
-    if comp_id == 'graph-5-data' or (comp_id == 'graph-6' and hover_data is None):
-        return plot_functions.linear_graph(
-            dff, full_period_len_df, start, end, start, end, items_names, lang, sk_value, labels_dict, 'items_count'
-            )
-    elif comp_id == 'graph-6':
-        point_x = datetime.strptime(hover_data['points'][0]['x'], '%Y-%m-%d')
-        if '-' not in hover_data['points'][0]['text']:
-            raise PreventUpdate
-        else:
-            return plot_functions.update_linear_graph_on_hover(point_x, dff, full_period_len_df, start, end, start, end, items_names, lang, sk_value, labels_dict, 'items_count')
+    start, end = selected_range(cleaned_datasets)
+    return plot_functions.linear_graph(
+        dff, period_len_df, start, end, start, end, lang, sk_value, labels_dict, 'items_count'
+        )
 
-# Translated slices of tables -> data for the graph-6 (median cost per item by period)
+# Figure of the graph-5, graph-6 hoverData -> graph-5
+# (the hovered period is highlighted on the client, see assets/linear_graph_hover.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='linear_graph', function_name='highlight_point'),
+    Output('graph-5', 'figure'),
+    Input('graph-5-figure', 'data'),
+    Input('graph-6', 'hoverData')
+)
+
+# Aggregates for the selected filters -> data for the graph-6 (median cost per item by period)
 @app.callback(
     Output('graph-6-data', 'data'),
     Input('tables-storage', 'data'),
-    State('translated-tables', 'data'),
     State('store-kind', 'value')
 )
-def update_data_graph_6(cleaned_ts_tables, ts_tables, sk_value):
-    full_datasets = json.loads(ts_tables)
-    full_ts_cost = pd.read_json(full_datasets['cost'], orient='split')
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    cleaned_ts_cost = pd.read_json(cleaned_datasets['cost'], orient='split')
-    items_names = cleaned_ts_cost.columns
-    dff = full_ts_cost[items_names].apply(
-        lambda x: np.median(x[x != 0]) if np.any(x != 0) else 0, axis=1).to_frame()
+def update_data_graph_6(cleaned_ts_tables, sk_value):
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    dff = read_table(cleaned_datasets['by_period'])[['median']].set_axis([0], axis=1)
     graph_data = {
         'to_plot' : dff.to_json(orient='split', date_format='epoch'),
         'sk_value' : json.dumps([sk_value])
     }
-    return json.dumps(graph_data)
+    return store.put(json.dumps(graph_data))
 
-# Data for the graph-6, graph-5 hoverData -> graph-6
+# Data for the graph-6 -> figure of the graph-6
 @app.callback(
-    Output('graph-6', 'figure'),
+    Output('graph-6-figure', 'data'),
     Input('graph-6-data', 'data'),
-    Input('graph-5', 'hoverData'),
     State('tables-storage', 'data'),
-    State('translated-tables', 'data'),
     State('dictionaries', 'data'),
     State('language-selector', 'value')
 )
-def update_graph_6(graph_tables, hover_data, cleaned_ts_tables, ts_tables, dicts, lang):
+def update_graph_6(graph_tables, cleaned_ts_tables, dicts, lang):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    full_datasets = json.loads(ts_tables)
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    graph_data = json.loads(graph_tables)
-    dff = pd.read_json(graph_data['to_plot'], orient='split')
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    graph_data = load_storage(graph_tables)
+    dff = read_table(graph_data['to_plot'])
     sk_value = json.loads(graph_data['sk_value'])[0]
-    full_period_len_df = pd.read_json(full_datasets['period_len_df'], orient='split')
-    cleaned_ts_cost = pd.read_json(cleaned_datasets['cost'], orient='split')
-    start = cleaned_ts_cost.index[0]
-    end = cleaned_ts_cost.index[-1]
-    items_names = cleaned_ts_cost.columns
-    comp_id = ctx.triggered_id
-    if comp_id == 'graph-6-data' or (comp_id == 'graph-5' and hover_data is None):
-        return plot_functions.linear_graph(
-            dff, full_period_len_df, start, end, start, end, items_names, lang, sk_value, labels_dict, 'medians_count'
-            )
-    elif comp_id == 'graph-5':
-        point_x = datetime.strptime(hover_data['points'][0]['x'], '%Y-%m-%d')
-        if '-' not in hover_data['points'][0]['text']:
-            raise PreventUpdate
-        else:
-            return plot_functions.update_linear_graph_on_hover(point_x, dff, full_period_len_df, start, end, start, end, items_names, lang, sk_value, labels_dict, 'medians_count')
+    start, end = selected_range(cleaned_datasets)
+    return plot_functions.linear_graph(
+        dff, period_len_df, start, end, start, end, lang, sk_value, labels_dict, 'medians_count'
+        )
+
+# Figure of the graph-6, graph-5 hoverData -> graph-6
+# (the hovered period is highlighted on the client, see assets/linear_graph_hover.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='linear_graph', function_name='highlight_point'),
+    Output('graph-6', 'figure'),
+    Input('graph-6-figure', 'data'),
+    Input('graph-5', 'hoverData')
+)
 
 # Dictionaries -> increase clicks of the graph-5 help button on 2
 @app.callback(
@@ -1811,7 +1814,7 @@ def show_tooltip_graph_6(n_clicks, dicts):
     }
     return create_tooltip(n_clicks, labels_dict['graph_6_help_title'], items_list, add_style=add_style)
 
-# Translated slices of tables -> graph-7
+# Aggregates for the selected filters -> graph-7
 # (interralation between items' number and median cost per item)
 @app.callback(
     Output('graph-7', 'figure'),
@@ -1822,10 +1825,9 @@ def show_tooltip_graph_6(n_clicks, dicts):
 def update_graph_7(cleaned_ts_tables, dicts, sk_value):
     dictionaries = json.loads(dicts)
     labels_dict = dictionaries['labels']
-    cleaned_datasets = json.loads(cleaned_ts_tables)
-    cleaned_ts_cost = pd.read_json(cleaned_datasets['cost'], orient='split')
-    cleaned_ts_period_df = pd.read_json(cleaned_datasets['period_len_df'], orient='split')
-    return plot_functions.scatter_graph(cleaned_ts_cost, cleaned_ts_period_df, sk_value, labels_dict)
+    cleaned_datasets = load_storage(cleaned_ts_tables)
+    scatter_data = read_table(cleaned_datasets['scatter'])
+    return plot_functions.scatter_graph(scatter_data, period_len_df, sk_value, labels_dict)
 
 # Dictionaries -> increase clicks of the graph-7 help button on 2
 @app.callback(
@@ -1888,5 +1890,10 @@ def update_footer_position(style):
     }
     return footer_style, margin_footer
 
+# Statistics of the cache of query results of this worker
+@server.route('/stats/query-cache')
+def query_cache_stats():
+    return query_cache.stats()
+
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -0,0 +1,166 @@
+// Highlight of the point hovered on the neighbouring graph (graphs 5 and 6).
+// The figure is created by the linear_graph function: each subplot has three traces
+// (bars of all periods, the line of periods in the date range, holidays' markers),
+// rectangles and annotations of a subplot are referenced to its y-axis domain.
+// The hovered period becomes the only period in the date range of its subplot:
+// the line keeps one point, holidays' markers and rectangles of the maximal and minimal values are hidden,
+// other periods are dimmed and the value is shown by the annotation.
+
+const DAY = 24 * 60 * 60 * 1000;
+// Hover events are coalesced: the highlight is drawn if the pointer stays on the period
+// for this number of milliseconds, events superseded by newer ones are dropped
+const HOVER_DELAY = 60;
+// Number of the last event of each graph
+const lastEvents = {};
+// Numbers of received hover events and events dropped as superseded
+// (window.dash_clientside.linear_graph.hover_stats in the browser's console)
+const hoverStats = {received: 0, dropped: 0};
+
+// Shift a date of the figure ("2021-02-13T00:00:00") by the number of days
+function shiftDate(date, days) {
+    const time = Date.parse(date.slice(0, 19) + 'Z') + days * DAY;
+    return new Date(time).toISOString().slice(0, 19);
+}
+
+// Fill the hover template of a point of the line (only the value's part of the template is used)
+function fillTemplate(template, y, customdata) {
+    return template
+        .replace('%{y:.2f}', Number(y).toFixed(2))
+        .replace('%{y}', String(y))
+        .replace(/%\{customdata\[(\d+)\]\}/g, (match, i) => customdata[Number(i)]);
+}
+
+function dimmingRect(x0, x1, xref, yref) {
+    return {
+        fillcolor: '#FFFFFF',
+        line: {width: 0},
+        opacity: 0.65,
+        type: 'rect',
+        x0: x0,
+        x1: x1,
+        xref: xref,
+        y0: 0,
+        y1: 1,
+        yref: yref + ' domain'
+    };
+}
+
+function highlightPoint(figure, hoverData) {
+    const noUpdate = window.dash_clientside.no_update;
+    const context = window.dash_clientside.callback_context;
+    const graph = context.inputs_list[0].id;
+    const event = (lastEvents[graph] || 0) + 1;
+    lastEvents[graph] = event;
+    if (!figure) {
+        return noUpdate;
+    }
+    const triggered = context.triggered.map(t => t.prop_id);
+    if (hoverData === null || hoverData === undefined || !triggered.some(id => id.endsWith('.hoverData'))) {
+        return figure;
+    }
+    hoverStats.received += 1;
+    return new Promise(resolve => setTimeout(() => {
+        if (lastEvents[graph] !== event) {
+            hoverStats.dropped += 1;
+            resolve(noUpdate);
+        } else {
+            resolve(highlightedFigure(figure, hoverData));
+        }
+    }, HOVER_DELAY));
+}
+
+function highlightedFigure(figure, hoverData) {
+    const noUpdate = window.dash_clientside.no_update;
+    const point = hoverData.points[0];
+    // only points of lines are highlighted (holidays' markers are skipped)
+    if (point.curveNumber % 3 !== 1) {
+        return noUpdate;
+    }
+
+    // find the subplot and the position of the period on its line
+    const date = String(point.x).slice(0, 10);
+    const subplots = figure.data.length / 3;
+    let subplot = -1;
+    let position = -1;
+    for (let i = 0; i < subplots && subplot === -1; i++) {
+        position = figure.data[3 * i + 1].x.findIndex(x => String(x).slice(0, 10) === date);
+        if (position !== -1) {
+            subplot = i;
+        }
+    }
+    if (subplot === -1) {
+        return noUpdate;
+    }
+    const bars = figure.data[3 * subplot];
+    const line = figure.data[3 * subplot + 1];
+    const xref = line.xaxis;
+    const yref = line.yaxis;
+    const x = line.x[position];
+    const y = line.y[position];
+    const customdata = line.customdata ? line.customdata[position] : [];
+
+    // traces: the line of the subplot keeps one point, its holidays' markers are hidden
+    const data = [];
+    figure.data.forEach((trace, i) => {
+        if (i === 3 * subplot + 1) {
+            const single = {x: [x], y: [y]};
+            if (trace.customdata) {
+                single.customdata = [customdata];
+            }
+            data.push(Object.assign({}, trace, single));
+        } else if (i !== 3 * subplot + 2) {
+            data.push(trace);
+        }
+    });
+
+    // rectangles and annotations: other subplots are not changed,
+    // periods before and after the hovered one are dimmed
+    const inSubplot = item => item.yref === yref + ' domain';
+    const shapes = [];
+    figure.data.forEach((trace, i) => {
+        if (i % 3 !== 1) {
+            return;
+        }
+        if (i !== 3 * subplot + 1) {
+            (figure.layout.shapes || []).forEach(shape => {
+                if (shape.yref === trace.yaxis + ' domain') {
+                    shapes.push(shape);
+                }
+            });
+            return;
+        }
+        const dates = bars.x.map(d => String(d));
+        const before = dates.filter(d => d.slice(0, 10) < date);
+        const after = dates.filter(d => d.slice(0, 10) > date);
+        if (before.length > 0) {
+            shapes.push(dimmingRect(shiftDate(before[0], -2), shiftDate(before[before.length - 1], 2), xref, yref));
+        }
+        if (after.length > 0) {
+            shapes.push(dimmingRect(shiftDate(after[0], -2), shiftDate(after[after.length - 1], 2), xref, yref));
+        }
+    });
+    const annotations = (figure.layout.annotations || []).filter(a => !inSubplot(a));
+    annotations.push({
+        bgcolor: '#FFFFFF',
+        bordercolor: '#382250',
+        borderwidth: 1,
+        font: {color: '#000000', family: 'Source Sans Pro, sans-serif', size: 16},
+        showarrow: true,
+        // the value's part of the line's hover text ("<b>54 items</b>")
+        text: fillTemplate(line.hovertemplate.slice(0, line.hovertemplate.indexOf('</b>') + 4), y, customdata),
+        x: x,
+        xref: xref,
+        y: y,
+        yref: yref
+    });
+
+    const layout = Object.assign({}, figure.layout, {shapes: shapes, annotations: annotations});
+    return Object.assign({}, figure, {data: data, layout: layout});
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    linear_graph: {
+        highlight_point: highlightPoint,
+        hover_stats: hoverStats
+    }
+});
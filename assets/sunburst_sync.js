@@ -0,0 +1,80 @@
+// Synchronization of the items' quantity shares plots (graphs 3 and 4) with the items' cost shares plot (graph-2).
+// The figure of a plot is created by the sunburst_sync_data function. Points of the plot are in the post-order
+// (each label follows its descendants), so the subtree of a label is the range of points
+// from the start of its subtree (subtree_start) to the label itself.
+
+// Colorscale of a plot with one label
+const FLAT_COLORSCALE = [[0, '#FFF6EC'], [1, '#FFF6EC']];
+
+// The subtree of the label at the position, the label becomes the center of the plot
+function subtreeFigure(figure, subtreeStart, position) {
+    const trace = figure.data[0];
+    const slice = array => array.slice(subtreeStart[position], position + 1);
+    const parents = slice(trace.parents);
+    parents[parents.length - 1] = '';
+    const marker = Object.assign({}, trace.marker, {colors: slice(trace.marker.colors)});
+    if (parents.length <= 1) {
+        marker.colorscale = FLAT_COLORSCALE;
+    }
+    const data = Object.assign({}, trace, {
+        labels: slice(trace.labels),
+        parents: parents,
+        values: slice(trace.values),
+        hovertext: slice(trace.hovertext),
+        marker: marker
+    });
+    return Object.assign({}, figure, {data: [data]});
+}
+
+// The figure for the label clicked on the items' cost shares plot: the subtree of the label
+// or of its parent (if the label is the center of the cost shares plot), the whole plot otherwise.
+// Clicks on items and on the center of the whole cost shares plot do not change the figure.
+function clickedFigure(figureData, clickData) {
+    const figure = figureData.figure;
+    const trace = figure.data[0];
+    const point = clickData.points[0];
+    const label = point.label;
+    const parent = point.parent;
+    const entry = 'entry' in point ? point.entry : '';
+    if (figureData.items.includes(label) || parent === '') {
+        return window.dash_clientside.no_update;
+    }
+    const position = trace.labels.indexOf(label);
+    const parentPosition = trace.labels.indexOf(parent);
+    const hasParent = parentPosition !== -1 && trace.parents.includes(parent);
+    if (position !== -1) {
+        if (label !== entry && entry !== '') {
+            return subtreeFigure(figure, figureData.subtree_start, position);
+        }
+        return hasParent ? subtreeFigure(figure, figureData.subtree_start, parentPosition) : figure;
+    }
+    if (hasParent && (label === entry || entry === '')) {
+        return subtreeFigure(figure, figureData.subtree_start, parentPosition);
+    }
+    return figure;
+}
+
+function syncQuantityPlot(figureData, clickData, syncValue) {
+    const noUpdate = window.dash_clientside.no_update;
+    if (!figureData) {
+        return noUpdate;
+    }
+    const triggered = window.dash_clientside.callback_context.triggered.map(t => t.prop_id);
+    const byClick = triggered.some(id => id.endsWith('.clickData'));
+    const bySwitch = triggered.some(id => id.endsWith('.value'));
+    // new data of the plot
+    if (!byClick && !bySwitch) {
+        return figureData.figure;
+    }
+    // the synchronization is turned off: clicks are ignored
+    if (syncValue !== figureData.sync_on) {
+        return byClick && clickData ? noUpdate : figureData.figure;
+    }
+    return clickData ? clickedFigure(figureData, clickData) : figureData.figure;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    sunburst: {
+        sync_quantity_plot: syncQuantityPlot
+    }
+});
@@ -0,0 +1,261 @@
+import sys
+import json
+import timeit
+import pandas as pd
+import numpy as np
+
+import data_preprocessing
+
+# Benchmarks of the data processing steps.
+# Run all of them: python benchmarks.py
+# Run selected ones: python benchmarks.py numeric_parsing ...
+
+DATA_FILE = 'data/Products.csv'
+# The number of copies of the sheet's columns to emulate several years of data
+YEARS_COPIES = 7
+
+# Helper function to print the timing of the old and the new implementation
+def report(name, old_time, new_time):
+    print(f'{name}: old {old_time * 1000:.1f} ms, new {new_time * 1000:.1f} ms, speedup {old_time / new_time:.1f}x')
+
+# Helper function to get the best time of several runs
+def best_time(func, number=1, repeat=3):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+# Helper function to create a sheet with several years of data (numeric columns are copied)
+def multi_year_sheet(copies=YEARS_COPIES):
+    df = pd.read_csv(DATA_FILE, delimiter=';')
+    numeric = df.iloc[:, 2:]
+    numeric = numeric[[col for col in numeric.columns if 'Info' not in col]]
+    blocks = [df.iloc[:, :2]] + [numeric] * copies
+    sheet = pd.concat(blocks, axis=1)
+    sheet.columns = list(range(sheet.shape[1]))
+    return sheet
+
+# 1. Numeric values parsing
+def bench_numeric_parsing():
+    numeric = multi_year_sheet().iloc[1:-2, 2:].fillna(0)
+
+    def old():
+        df = numeric.copy()
+        for col in df.columns:
+            df[col] = df[col].apply(lambda x: float(str(x).replace(',', '.').replace('\xa0', '')))
+        return df
+
+    def new():
+        return data_preprocessing.parse_numeric_values(numeric)
+
+    assert (old().to_numpy() == new().to_numpy()).all()
+    report(f'numeric_parsing ({numeric.shape[0]} x {numeric.shape[1]})', best_time(old), best_time(new))
+
+# 2. Translated tables for a session (the app module is imported, so the data is loaded once)
+def bench_translate_tables():
+    import app
+
+    def old():
+        return app.translate_datasets(app.create_dictionaries('Русский')['items'])
+
+    def new():
+        dicts = app.update_dictionaries('Русский')
+        return app.store.get(app.translate_tables(dicts, 'Русский'))
+
+    assert old() == new()
+    report('translate_tables (per session)', best_time(old, number=5), best_time(new, number=1000))
+
+# 3. Size of the translated tables storage sent between the browser and the server
+def bench_storage_size():
+    import app
+
+    key = app.translate_tables(app.update_dictionaries('English'), 'English')
+    payload = app.store.get(key)
+    print(f'storage_size (translated-tables): payload {len(payload.encode()) / 1024:.1f} KB, key {len(key)} B')
+
+# 4. Decoding of the translated tables in the clean_data callback
+def bench_decode_tables():
+    import app
+
+    key = app.translate_tables(app.update_dictionaries('English'), 'English')
+    names = ['cost', 'quantity', 'prod_subcat', 'subcat_cat', 'cost_others', 'quantity_others']
+
+    def old():
+        datasets = json.loads(app.store.get(key))
+        return [pd.read_json(datasets[name], orient='split') for name in names]
+
+    def new():
+        datasets = app.load_storage(key)
+        return [app.read_table(datasets[name]) for name in names]
+
+    assert all(a.equals(b) for a, b in zip(old(), new()))
+    report('decode_tables (clean_data)', best_time(old), best_time(new, number=100))
+
+# Helper function to repeat the preprocessed tables over several years (dates are shifted)
+def multi_year_tables(tables, copies=YEARS_COPIES):
+    period_len_df = tables[-1]
+    shift = period_len_df.index[-1] - period_len_df.index[0] + pd.Timedelta(days=1)
+    result = []
+    for df in tables:
+        blocks = [df.set_axis(df.index + shift * i, axis=0) for i in range(copies)]
+        result.append(pd.concat(blocks))
+    return result
+
+# 5. Date range aggregates (the sum of cost of all items and the number of days)
+def bench_range_aggregates():
+    import app
+    import period_index
+
+    cost, quantity, period_len_df = multi_year_tables([app.cost, app.quantity, app.period_len_df])
+    index = period_index.PeriodIndex(cost, quantity, period_len_df)
+    start, end = period_len_df.index[10], period_len_df.index[-10]
+
+    def old():
+        mask = (period_len_df.index <= end) & (period_len_df.index >= start)
+        period_len_dff = period_len_df[mask]
+        period_len_dff = period_len_dff[period_len_dff[0] != 0]
+        cost_slice = cost.loc[period_len_dff.index]
+        return cost_slice.sum().sum(), int(period_len_dff[0].sum() + len(period_len_dff))
+
+    def new():
+        return index.range_sum(start, end, 'super', 'cost').sum(), int(index.range_sum(start, end, 'super', 'days'))
+
+    assert abs(old()[0] - new()[0]) < 1e-6 * old()[0] and old()[1] == new()[1]
+    report(f'range_aggregates ({cost.shape[0]} periods)', best_time(old, number=10), best_time(new, number=100))
+
+# 6. Items available in the date range and the number of selected items bought in each period
+def bench_items_presence():
+    import app
+    import period_index
+
+    cost, quantity, period_len_df = multi_year_tables([app.cost, app.quantity, app.period_len_df])
+    index = period_index.PeriodIndex(cost, quantity, period_len_df)
+    start, end = period_len_df.index[10], period_len_df.index[-10]
+    items = list(range(0, cost.shape[1], 3))
+
+    def old():
+        mask = (period_len_df.index <= end) & (period_len_df.index >= start)
+        dates = period_len_df[mask]
+        dates = dates[dates[0] == 0]
+        available = cost.loc[dates.index].replace(0, np.nan).dropna(axis=1, how='all').columns
+        counts = cost[cost.columns[items]].apply(np.count_nonzero, axis=1)
+        return list(available), counts.tolist()
+
+    def new():
+        available = cost.columns[index.available_items(start, end, 'hyper')]
+        return list(available), index.items_counts(items).tolist()
+
+    assert old() == new()
+    report(f'items_presence ({cost.shape[0]} periods)', best_time(old), best_time(new, number=100))
+
+# 7. Filters of the menu (items of the product type)
+def bench_menu_filters():
+    import app
+
+    index = app.HIERARCHY_INDEXES['English']
+    items_dict = app.create_dictionaries('English')['items']
+    datasets = json.loads(app.store.get(app.TRANSLATED_TABLES['English']))
+    prod_subcat = pd.read_json(datasets['prod_subcat'], orient='split')
+    subcat_cat = pd.read_json(datasets['subcat_cat'], orient='split')
+    codes = list(range(len(index.items)))
+    type_value = items_dict['Продукты']
+
+    def old():
+        items = [index.items[code] for code in codes]
+        return sorted(
+            i for i in items if subcat_cat.loc[prod_subcat.loc[i, 'subcategory'], 'category'] == type_value
+        )
+
+    def new():
+        mask = index.items_mask(codes) & index.type_mask(type_value)
+        return sorted(index.items[mask].tolist())
+
+    assert old() == new()
+    report(f'menu_filters ({len(codes)} items)', best_time(old), best_time(new, number=100))
+
+# 8. Holidays' markers on the line of values by period
+def bench_holidays_markers():
+    import app
+    import plot_functions
+
+    cost, period_len_df = multi_year_tables([app.cost, app.period_len_df])
+    lang_dict = app.create_dictionaries('English')['labels']
+    df = cost.sum(axis=1).to_frame()
+    df['in_range'] = [1 if i >= df.index[10] else 0 for i in df.index]
+    holidays = {lang_dict[key] : f'{day:02}.{month:02}' for key, month, day in plot_functions.HOLIDAYS}
+
+    def old():
+        filtered_df = df[df['in_range'] == 1]
+        holidays_dates = []
+        for h, d in holidays.items():
+            for year in df.index.year.unique():
+                date = pd.to_datetime(f'{d}.{year}', format='%d.%m.%Y')
+                if filtered_df.index[0] <= date <= filtered_df.index[-1]:
+                    holidays_dates.append((h, date))
+        marker_positions = []
+        for hd in holidays_dates:
+            low, high = 0, len(filtered_df) - 1
+            while high - low > 1:
+                mid = (low + high) // 2
+                if hd[1] < filtered_df.index[mid]:
+                    high = mid
+                elif hd[1] > filtered_df.index[mid]:
+                    low = mid
+                else:
+                    low, high = mid, mid
+            b = filtered_df.iloc[low, 0]
+            k = (filtered_df.iloc[high, 0] - b) / (filtered_df.index[high] - filtered_df.index[low]).days \
+                if low != high else 0
+            marker_positions.append(k * (hd[1] - filtered_df.index[low]).days + b)
+        return marker_positions, holidays_dates
+
+    def new():
+        plot_functions.holidays_markers.cache_clear()
+        return plot_functions.add_holidays_dates(df, lang_dict)
+
+    def cached():
+        return plot_functions.add_holidays_dates(df, lang_dict)
+
+    assert np.allclose(old()[0], new()[0]) and old()[1] == new()[1]
+    report(f'holidays_markers ({len(df)} periods)', best_time(old), best_time(new, number=10))
+    report(f'holidays_markers, cached ({len(df)} periods)', best_time(old), best_time(cached, number=100))
+
+# 9. Tables of sunburst plots for catalogues of several sizes (the time should grow linearly)
+def bench_sunburst_dataframes():
+    import app
+    import plot_functions
+
+    lang_dict = app.create_dictionaries('English')['labels']
+    of_total_texts = {'cost' : lang_dict['of_total_sum'], 'vol' : lang_dict['of_total_vol'], 'pack' : lang_dict['of_total_vol']}
+    for items_number in (100, 1000, 10000):
+        items = [f'item {i}' for i in range(items_number)]
+        subcats = [f'subcategory {i // 10}' for i in range(items_number)]
+        prod_subcat = pd.DataFrame({'subcategory' : subcats}, index=items)
+        subcat_cat = pd.DataFrame(
+            {'category' : [f'type {i // 100}' for i in range(0, items_number, 10)]}, index=subcats[::10])
+        items_table = pd.DataFrame({
+            'cost' : np.arange(items_number, dtype=float),
+            'quantity' : np.arange(items_number, dtype=float) / 10,
+            'partial' : np.arange(items_number) % 7 == 0,
+            'pack' : np.arange(items_number) % 3 == 0
+        }, index=items)
+
+        def new():
+            return plot_functions.sunburst_dataframes(
+                items_table, prod_subcat, subcat_cat, lang_dict['total'], of_total_texts, lang_dict)
+
+        print(f'sunburst_dataframes ({items_number} items, three plots): {best_time(new) * 1000:.1f} ms')
+
+BENCHMARKS = {
+    'numeric_parsing' : bench_numeric_parsing,
+    'translate_tables' : bench_translate_tables,
+    'storage_size' : bench_storage_size,
+    'decode_tables' : bench_decode_tables,
+    'range_aggregates' : bench_range_aggregates,
+    'items_presence' : bench_items_presence,
+    'menu_filters' : bench_menu_filters,
+    'holidays_markers' : bench_holidays_markers,
+    'sunburst_dataframes' : bench_sunburst_dataframes,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -1,35 +1,239 @@
 import pandas as pd
-from datetime import datetime
+import numpy as np
 import re
 
-# Helper function to correct a date format
-def correct_date(str_date):
-    day, month, year = re.findall(r'[0-9]+.[0-9]+.[0-9]+', str_date)[0].split('.')
-    if len(day) < 2:
-        day = '0' + day
-    if len(month) < 2:
-        month = '0' + month
-    if len(year) < 4:
-        year = '20' + year
-    return '.'.join([day, month, year])
-
-# Helper function to determine an item's position in the index
-def find_idx(df, product_name):
-    return df[df['product_name'] == product_name].index[0]
-
-# Helper function to unite and delete rows
-def unite_and_delete_rows(df, category, product_name, idxs_list):
-    new_row = [category, product_name]
-    sum_values = df.loc[idxs_list[0], :]
-    for i in range(1, len(idxs_list)):
-        sum_values += df.loc[idxs_list[i], :]
-    new_row += list(sum_values.values[2:])
-    df.loc[max(df.index) + 1] = new_row
-    df = df.drop(labels=idxs_list, axis=0)
-    return df
+# The first date of the data used in the app (earlier columns are not complete)
+FIRST_DATE = pd.Timestamp(2021, 2, 13)
+# Periods longer than this number of days are intermediate aggregations
+MAX_PERIOD_LEN = 15
+# Header of a cost column: a date ("13.02.2021") or a period ("14.02.2021 - 20.02.2021")
+PERIOD_HEADER = r'^(\d+)[.](\d+)[.](\d+)(?:\s*-\s*(\d+)[.](\d+)[.](\d+))?$'
+
+# Items moved to another category: name -> new category
+CATEGORY_CHANGES = {
+    'Ирис' : 'Кондитерские изделия',
+    'Украшения для выпечки' : 'Бакалея'
+}
+
+# Items renamed to avoid duplicates: (category, name) -> new name
+NAME_CHANGES = {
+    ('Консервы', 'Говядина') : 'Говядина (консервированная)',
+    ('Консервы', 'Горбуша') : 'Горбуша (консервированная)',
+    ('Консервы', 'Свинина') : 'Свинина (консервированная)',
+    ('Консервы', 'Скумбрия') : 'Скумбрия (консервированная)',
+    ('Консервы', 'Тунец') : 'Тунец (консервированный)'
+}
+
+# Rows that are similar in meaning and united into one: (category, new name) -> names of items
+MERGE_RULES = {
+    ('Молочные продукты', 'Кисломолочные напитки') : [
+        'Актимель',
+        'Иммуноцея, варенец, ацидофилин',
+        'Молочный коктейль',
+        'Снежок'
+    ],
+    ('Молочные продукты', 'Сыр') : [
+        'Сыр (весовой)',
+        'Сыр плавленный, фетакса, рикотта и др.'
+    ],
+    ('Мясные продукты', 'Копченое мясо') : [
+        'Бекон',
+        'Бекон (весовой), карпаччо',
+        'Шпик, грудинка, окорок, сало, корейка'
+    ],
+    ('Рыба', 'Копченая рыба') : [
+        'Горбуша (копченая)',
+        'Скумбрия (копченая)'
+    ],
+    ('Консервы', 'Икра красная') : [
+        'Икра красная',
+        'Икра лососевая'
+    ],
+    ('Рыба', 'Морепродукты') : [
+        'Мидии',
+        'Морской коктейль (в масле), кальмар в рассоле',
+        'Паста из морепродуктов',
+        'Икра мойвы'
+    ],
+    ('Соусы', 'Соусы (разные виды)') : [
+        'Брусничный соус',
+        'Сальса, терияки',
+        'Соевый соус'
+    ],
+    ('Бакалея', 'Сухофрукты (кроме изюма, кураги, чернослива)') : [
+        'Бананы сушеные',
+        'Инжир (сушеный)',
+        'Клубника (сушеная)',
+        'Клюква (сушеная)',
+        'Финики'
+    ],
+    ('Бакалея', 'Ингредиенты для выпечки') : [
+        'Дрожжи, разрыхлитель',
+        'Кокосовая стружка',
+        'Мак',
+        'Тесто'
+    ],
+    ('Бакалея', 'Хлебцы') : [
+        'Галеты (крекеры)',
+        'Хлебцы'
+    ],
+    ('Бакалея', 'Сахар') : [
+        'Сахар',
+        'Пудра сахарная'
+    ],
+    ('Бакалея', 'Орехи, семечки') : [
+        'Орехи, семечки',
+        'Семечки (подсолнуха, тыквенные)'
+    ],
+    ('Бакалея', 'Продукты быстрого приготовления') : [
+        'Лапша быстрого приготовления (пюре)',
+        'Смесь для супа, суп быстрого приготовления'
+    ],
+    ('Кондитерские изделия', 'Зефир, пастила, лукум') : [
+        'Зефир',
+        'Пастила',
+        'Лукум'
+    ],
+    ('Кондитерские изделия', 'Баранки и сушки') : [
+        'Баранки',
+        'Сухари (сладкие)',
+        'Сушки, хлебные палочки'
+    ],
+    ('Кондитерские изделия', 'Десерт') : [
+        'Десерт (суфле, панна-котта, желе)',
+        'Пирог, пирожное, торт'
+    ],
+    ('Консервы', 'Консервированная рыба') : [
+        'Горбуша (консервированная)',
+        'Сайра (консервированная)',
+        'Скумбрия (консервированная)',
+        'Тунец (консервированный)',
+        'Шпроты'
+    ],
+    ('Консервы', 'Печень рыбная') : [
+        'Печень минтая',
+        'Печень трески'
+    ],
+    ('Товары для дома', 'Чистящие средства') : [
+        'Средство для пола',
+        'Чистящее средство (пемолюкс, для туалета и т.д.)'
+    ],
+    ('Товары для дома', 'Средства для волос') : [
+        'Средство для волос',
+        'Шампунь'
+    ]
+}
+
+# Units of items: "kg_l" - kilograms or litres, "pack" - packs or pieces (the quantity is integer)
+UNITS = ['kg_l', 'pack']
+# Items measured in kilograms even if all their quantities are integer
+WEIGHED_ITEMS = ['Мука']
+
+# Items in the "Other expenses" category (all rows from the first item to the last one)
+# are united into one row except useful ones
+OTHERS_RANGE = ('Аптечка', 'Штора для ванной')
+OTHERS_TARGET = ('Остальные расходы', 'Прочие товары')
+USEFUL_OTHERS = [
+    'Канцтовары',
+    'Очки',
+    'Носки',
+    'Одноразовая посуда',
+    'Пакет (обычный)',
+    'Посуда'
+]
+
+# Helper function to convert columns with parts of dates into datetime values
+# (two-digit years are the years of the 21th century)
+def parts_to_dates(day, month, year):
+    year = year.where(year.str.len() == 4, '20' + year)
+    return pd.to_datetime(pd.DataFrame({
+        'year' : year.astype(int),
+        'month' : month.astype(int),
+        'day' : day.astype(int)
+    }))
+
+# Helper function to parse headers of the sheet's columns into the table of periods.
+# Each cost column (a date or a period in the header) is followed by a quantity column.
+# The period kind: "hyper" - one day of purchases in a hypermarket,
+# "super" - purchases in supermarkets during the period, "aggregate" - an intermediate aggregation.
+def parse_period_headers(columns):
+    headers = pd.Series([str(col) for col in columns])
+    parts = headers.str.extract(PERIOD_HEADER)
+    positions = np.flatnonzero(parts[0].notna())
+    parts = parts.iloc[positions]
+    start = parts_to_dates(parts[0], parts[1], parts[2])
+    end = parts_to_dates(parts[3].fillna(parts[0]), parts[4].fillna(parts[1]), parts[5].fillna(parts[2]))
+    length = (end - start).dt.days
+    length = length.where(length != 1, 0)
+    kind = np.select([length > MAX_PERIOD_LEN, length == 0], ['aggregate', 'hyper'], 'super')
+    return pd.DataFrame({
+        'start' : start.values,
+        'end' : end.values,
+        'length' : length.values,
+        'kind' : kind,
+        'cost_column' : [columns[i] for i in positions],
+        'quantity_column' : [columns[i + 1] for i in positions]
+    })
+
+# Helper function to convert numeric values written with a decimal comma
+# and a non-breaking space as a thousands separator into floats
+# (all columns of the dataframe are converted in one pass)
+def parse_numeric_values(df):
+    values = pd.Series(df.to_numpy().ravel()).astype(str)
+    values = values.str.replace(',', '.', regex=False).str.replace('\xa0', '', regex=False)
+    values = values.astype(float).to_numpy().reshape(df.shape)
+    return pd.DataFrame(values, index=df.index, columns=df.columns)
+
+# Helper function to build the hash index "item's name -> row position"
+def name_positions(df):
+    return pd.Series(np.arange(len(df)), index=df['product_name'].values)
+
+# Helper function to apply the rules of changing categories and names and uniting rows.
+# United rows are added to the end of the dataframe in the order of the rules.
+# Returns the dataframe and rows of the "Other expenses" category (before uniting).
+def apply_merge_rules(df):
+    df = df.reset_index(drop=True)
+    df['category'] = df['product_name'].map(CATEGORY_CHANGES).fillna(df['category'])
+    df['product_name'] = [
+        NAME_CHANGES.get((category, name), name) for category, name in zip(df['category'], df['product_name'])
+    ]
+
+    ## determine positions of rows united into each new row
+    positions = name_positions(df)
+    others_positions = np.arange(positions[OTHERS_RANGE[0]], positions[OTHERS_RANGE[1]] + 1)
+    others_data = df.iloc[others_positions]
+    groups = {target : positions[names].values for target, names in MERGE_RULES.items()}
+    groups[OTHERS_TARGET] = np.setdiff1d(others_positions, positions[USEFUL_OTHERS].values)
+
+    ## sum values of united rows (rows of a group are added one by one in the order of the rule,
+    ## so the sums are exactly the same as the sequential additions of the sheet's rows)
+    merged_positions = np.concatenate(list(groups.values()))
+    values = df.iloc[:, 2:].to_numpy(dtype=float)
+    sums = np.empty((len(groups), values.shape[1]))
+    for i, group in enumerate(groups.values()):
+        sums[i] = values[group[0]]
+        for position in group[1:]:
+            sums[i] += values[position]
+    united = pd.DataFrame(sums, columns=df.columns[2:])
+    united.insert(0, 'category', [target[0] for target in groups])
+    united.insert(1, 'product_name', [target[1] for target in groups])
+    kept = np.ones(len(df), dtype=bool)
+    kept[merged_positions] = False
+
+    return pd.concat([df[kept], united], ignore_index=True), others_data
 
 # Main function to preprocess data
 def data_preprocessing(df):
+    return complete_tables(preprocess_sheet(df))
+
+# Function to complete tables of the preprocessed sheet (after all its columns are appended)
+def complete_tables(tables):
+    return add_item_units(drop_empty_items(tables))
+
+# Function to preprocess the sheet without deleting items that have never been bought.
+# The sheet can contain only a part of date columns (with the category and the item name columns),
+# it is used to preprocess new columns of the sheet (see the append_periods function).
+def preprocess_sheet(df):
 
     ## delete "Info" columns
     columns = df.columns.tolist()
@@ -37,39 +241,22 @@ def data_preprocessing(df):
                          if len(re.findall(r'Info.*', str(col))) > 0]
     clean_df = df.drop(columns_to_delete, axis=1)
 
-    ## delete intermediate aggregation
-    columns = clean_df.columns.tolist()
-    columns_to_delete = []
-    for i in range(len(columns)):
-        col_split = str(columns[i]).split('-')
-        if len(col_split) == 2 and col_split[1] != '':
-            fmt = '%d.%m.%Y'
-            delta = datetime.strptime(correct_date(col_split[1]), fmt) -\
-                datetime.strptime(correct_date(col_split[0]), fmt)
-            if delta.days > 15:
-                columns_to_delete.append(columns[i])
-                columns_to_delete.append(columns[i + 1])
-    clean_df = clean_df.drop(columns=columns_to_delete)
+    ## parse the columns' headers into the table of periods,
+    ## delete intermediate aggregation and columns corresponding to dates before 13th February, 2021
+    periods = parse_period_headers(clean_df.columns.tolist())
+    periods = periods[(periods['kind'] != 'aggregate') & (periods['start'] >= FIRST_DATE)]
+    periods = periods.reset_index(drop=True)
+    date_columns = [col for pair in zip(periods['cost_column'], periods['quantity_column']) for col in pair]
+    clean_df = clean_df[clean_df.columns[:2].tolist() + date_columns]
 
     ## fill missing values in the product's category column
-    clean_df['Unnamed: 0'] = clean_df['Unnamed: 0'].fillna(method='ffill')
-
-    ## delete columns corresponding to dates before 13th February, 2021
-    columns_to_keep = [i for i in range(clean_df.shape[1]) if i not in [2, 3, 4, 5]]
-    clean_df = clean_df.iloc[:, columns_to_keep]
+    clean_df.iloc[:, 0] = clean_df.iloc[:, 0].fillna(method='ffill')
 
     ## delete the first and the last two lines
     clean_df = clean_df.drop(clean_df.index[[0, -2, -1]])
 
     ## correct columns names
-    columns_names = clean_df.columns.tolist()
-    columns_names[0], columns_names[1] = 'category', 'product_name'
-    for i in range(2, len(columns_names)):
-        if str(columns_names[i]).count('.') == 2:
-            columns_names[i] = datetime.strptime(str(columns_names[i]), '%d.%m.%Y')
-        if str(columns_names[i]).count('.') in [3, 5] or 'Unnamed' in str(columns_names[i]):
-            columns_names[i] = str(columns_names[i - 1]) + '.q'
-    clean_df.columns = columns_names
+    clean_df.columns = ['category', 'product_name'] + date_columns
 
     ## delete unnecessary spaces from items names
     clean_df['product_name'] = clean_df['product_name'].apply(lambda x: x.strip())
@@ -77,143 +264,11 @@ def data_preprocessing(df):
     ## fill missing numeric values by zero
     clean_df = clean_df.fillna(0)
 
-    ## change the category for some items
-    clean_df.loc[find_idx(clean_df, 'Ирис') ,'category'] = 'Кондитерские изделия'
-    clean_df.loc[
-        find_idx(
-            clean_df, 'Украшения для выпечки'
-        ) ,'category'] = 'Бакалея'
-
-    ## change items names to avoid duplicates
-    change_prod_names = {
-        ('Консервы', 'Говядина') : 'Говядина (консервированная)',
-        ('Консервы', 'Горбуша') : 'Горбуша (консервированная)',
-        ('Консервы', 'Свинина') : 'Свинина (консервированная)',
-        ('Консервы', 'Скумбрия') : 'Скумбрия (консервированная)',
-        ('Консервы', 'Тунец') : 'Тунец (консервированный)'
-
-    }
-    for key, value in change_prod_names.items():
-        clean_df.loc[clean_df[(clean_df['category'] == key[0]) & (clean_df['product_name'] == key[1])].index[0],
-                     'product_name'] = value
-
     ## correct the format of numeric values
-    for col in clean_df.columns[2:]:
-        clean_df[col] = clean_df[col].apply(lambda x: float(str(x).replace(',', '.').replace('\xa0', '')))
-
-    ## unite rows that are similar in meaning
-    unite_delete_dict = {
-        ('Молочные продукты', 'Кисломолочные напитки') : [
-            find_idx(clean_df, 'Актимель'),
-            find_idx(clean_df, 'Иммуноцея, варенец, ацидофилин'),
-            find_idx(clean_df, 'Молочный коктейль'),
-            find_idx(clean_df, 'Снежок')
-        ],
-        ('Молочные продукты', 'Сыр') : [
-            find_idx(clean_df, 'Сыр (весовой)'),
-            find_idx(clean_df, 'Сыр плавленный, фетакса, рикотта и др.')
-        ],
-        ('Мясные продукты', 'Копченое мясо') : [
-            find_idx(clean_df, 'Бекон'),
-            find_idx(clean_df, 'Бекон (весовой), карпаччо'),
-            find_idx(clean_df, 'Шпик, грудинка, окорок, сало, корейка')
-        ],
-        ('Рыба', 'Копченая рыба') : [
-            find_idx(clean_df, 'Горбуша (копченая)'),
-            find_idx(clean_df, 'Скумбрия (копченая)')
-        ],
-        ('Консервы', 'Икра красная') : [
-            find_idx(clean_df, 'Икра красная'),
-            find_idx(clean_df, 'Икра лососевая')
-        ],
-        ('Рыба', 'Морепродукты') : [
-            find_idx(clean_df, 'Мидии'),
-            find_idx(clean_df, 'Морской коктейль (в масле), кальмар в рассоле'),
-            find_idx(clean_df, 'Паста из морепродуктов'),
-            find_idx(clean_df, 'Икра мойвы')
-        ],
-        ('Соусы', 'Соусы (разные виды)') : [
-            find_idx(clean_df, 'Брусничный соус'),
-            find_idx(clean_df, 'Сальса, терияки'),
-            find_idx(clean_df, 'Соевый соус')
-        ],
-        ('Бакалея', 'Сухофрукты (кроме изюма, кураги, чернослива)') : [
-            find_idx(clean_df, 'Бананы сушеные'),
-            find_idx(clean_df, 'Инжир (сушеный)'),
-            find_idx(clean_df, 'Клубника (сушеная)'),
-            find_idx(clean_df, 'Клюква (сушеная)'),
-            find_idx(clean_df, 'Финики')
-        ],
-        ('Бакалея', 'Ингредиенты для выпечки') : [
-            find_idx(clean_df, 'Дрожжи, разрыхлитель'),
-            find_idx(clean_df, 'Кокосовая стружка'),
-            find_idx(clean_df, 'Мак'),
-            find_idx(clean_df, 'Тесто')
-        ],
-        ('Бакалея', 'Хлебцы') : [
-            find_idx(clean_df, 'Галеты (крекеры)'),
-            find_idx(clean_df, 'Хлебцы')
-        ],
-        ('Бакалея', 'Сахар') : [
-            find_idx(clean_df, 'Сахар'),
-            find_idx(clean_df, 'Пудра сахарная')
-        ],
-        ('Бакалея', 'Орехи, семечки') : [
-            find_idx(clean_df, 'Орехи, семечки'),
-            find_idx(clean_df, 'Семечки (подсолнуха, тыквенные)')
-        ],
-        ('Бакалея', 'Продукты быстрого приготовления') : [
-            find_idx(clean_df, 'Лапша быстрого приготовления (пюре)'),
-            find_idx(clean_df, 'Смесь для супа, суп быстрого приготовления')
-        ],
-        ('Кондитерские изделия', 'Зефир, пастила, лукум') : [
-            find_idx(clean_df, 'Зефир'),
-            find_idx(clean_df, 'Пастила'),
-            find_idx(clean_df, 'Лукум')
-        ],
-        ('Кондитерские изделия', 'Баранки и сушки') : [
-            find_idx(clean_df, 'Баранки'),
-            find_idx(clean_df, 'Сухари (сладкие)'),
-            find_idx(clean_df, 'Сушки, хлебные палочки')
-        ],
-        ('Кондитерские изделия', 'Десерт') : [
-            find_idx(clean_df, 'Десерт (суфле, панна-котта, желе)'),
-            find_idx(clean_df, 'Пирог, пирожное, торт')
-        ],
-        ('Консервы', 'Консервированная рыба') : [
-            find_idx(clean_df, 'Горбуша (консервированная)'),
-            find_idx(clean_df, 'Сайра (консервированная)'),
-            find_idx(clean_df, 'Скумбрия (консервированная)'),
-            find_idx(clean_df, 'Тунец (консервированный)'),
-            find_idx(clean_df, 'Шпроты')
-        ],
-        ('Консервы', 'Печень рыбная') : [
-            find_idx(clean_df, 'Печень минтая'),
-            find_idx(clean_df, 'Печень трески')
-        ],
-        ('Товары для дома', 'Чистящие средства') : [
-            find_idx(clean_df, 'Средство для пола'),
-            find_idx(clean_df, 'Чистящее средство (пемолюкс, для туалета и т.д.)')
-        ],
-        ('Товары для дома', 'Средства для волос') : [
-            find_idx(clean_df, 'Средство для волос'),
-            find_idx(clean_df, 'Шампунь')
-        ]
-    }
-    others_idx = list(range(find_idx(clean_df, 'Аптечка'), find_idx(clean_df, 'Штора для ванной') + 1))
-    useful_others = [
-        find_idx(clean_df, 'Канцтовары'),
-        find_idx(clean_df, 'Очки'),
-        find_idx(clean_df, 'Носки'),
-        find_idx(clean_df, 'Одноразовая посуда'),
-        find_idx(clean_df, 'Пакет (обычный)'),
-        find_idx(clean_df, 'Посуда')
-    ]
-    others_idx_final = [i for i in others_idx if i not in useful_others]
-    unite_delete_dict['Остальные расходы', 'Прочие товары'] = others_idx_final
-    others_data = clean_df.loc[others_idx]
-    for key, value in unite_delete_dict.items():
-        clean_df = unite_and_delete_rows(clean_df, key[0], key[1], value)
+    clean_df = pd.concat([clean_df.iloc[:, :2], parse_numeric_values(clean_df.iloc[:, 2:])], axis=1)
+
+    ## change categories and names of some items, unite rows that are similar in meaning
+    clean_df, others_data = apply_merge_rules(clean_df)
 
     ## create the dataframe "product category -> product type"
     subcat_cat = pd.DataFrame({
@@ -230,42 +285,65 @@ def data_preprocessing(df):
     prod_subcat.columns = ['subcategory']
 
     ## сreate dataframes with cost values (main and for items in "Other expenses" category)
-    cost_columns = [col for col in clean_df.columns.tolist() if '.q' not in str(col)]
-    cost = clean_df[cost_columns].drop('category', axis=1).set_index('product_name').T
-    cost_others = others_data[cost_columns].drop('category', axis=1).set_index('product_name').T
+    cost_columns = ['product_name'] + periods['cost_column'].tolist()
+    cost = clean_df[cost_columns].set_index('product_name').T
+    cost_others = others_data[cost_columns].set_index('product_name').T
 
     ## create dataframes with quantity values (main and for items in "Other expenses" category)
-    quantity_columns = [col for col in clean_df.columns.tolist() if '.q' in str(col)]
-    quantity_columns.insert(0, 'product_name')
+    quantity_columns = ['product_name'] + periods['quantity_column'].tolist()
     quantity = clean_df[quantity_columns].set_index('product_name').T
     quantity['Яйца куриные'] = quantity['Яйца куриные'] * 10
     quantity['Яйца перепелиные'] = quantity['Яйца перепелиные'] * 20
     quantity_others = others_data[quantity_columns].set_index('product_name').T
 
-    ## delete columns that are fully consisting of zeros from the cost dataframe
-    ## and corresponding columns from the quantity dataframe and rows from the prod_subcat dataframe
-    zero_columns = [col for col in cost.columns if cost[col].sum() == 0]
-    cost.drop(zero_columns, axis=1, inplace=True)
-    quantity.drop(zero_columns, axis=1, inplace=True)
-    prod_subcat.drop(zero_columns, axis=0, inplace=True)
-
-    ## create table with lengths of periods
-    period_len = {}
-    for idx in cost.index:
-        if str(idx).count('-') == 1:
-            start_date = datetime.strptime(correct_date(idx.split('-')[0]), '%d.%m.%Y')
-            end_date = datetime.strptime(correct_date(idx.split('-')[1]), '%d.%m.%Y')
-            period_len[end_date] = (end_date - start_date).days
-        else:
-            period_len[idx] = 1
-    period_len_df = pd.DataFrame(period_len.values(), index=period_len.keys())
-    period_len_df.replace(1, 0, inplace=True)
+    ## create table with lengths of periods (the index is the last date of a period)
+    period_len_df = pd.DataFrame(periods['length'].values, index=pd.DatetimeIndex(periods['end']))
+    period_len_df.index.name = None
 
     ## set index values for cost dataframes and quantity dataframes
     ## (main and for items in "Other expenses" category)
-    cost.index = period_len.keys()
-    quantity.index = period_len.keys()
-    cost_others.index = period_len.keys()
-    quantity_others.index = period_len.keys()
+    cost.index = period_len_df.index
+    quantity.index = period_len_df.index
+    cost_others.index = period_len_df.index
+    quantity_others.index = period_len_df.index
+
+    return subcat_cat, prod_subcat, cost, quantity, cost_others, quantity_others, period_len_df
+
+# Function to append tables of new periods (the result of the preprocess_sheet function
+# for new columns of the sheet) to tables of the preprocessed sheet
+def append_periods(tables, new_tables):
+    subcat_cat, prod_subcat, cost, quantity, cost_others, quantity_others, period_len_df = tables
+    _, _, new_cost, new_quantity, new_cost_others, new_quantity_others, new_period_len_df = new_tables
+    if new_period_len_df.shape[0] > 0 and new_period_len_df.index[0] <= period_len_df.index[-1]:
+        raise ValueError('New periods must follow the preprocessed ones')
+    return (
+        subcat_cat,
+        prod_subcat,
+        pd.concat([cost, new_cost[cost.columns]]),
+        pd.concat([quantity, new_quantity[quantity.columns]]),
+        pd.concat([cost_others, new_cost_others[cost_others.columns]]),
+        pd.concat([quantity_others, new_quantity_others[quantity_others.columns]]),
+        pd.concat([period_len_df, new_period_len_df])
+    )
+
+# Function to delete items that are fully consisting of zeros in the cost dataframe
+# (columns from the cost and quantity dataframes and rows from the prod_subcat dataframe)
+def drop_empty_items(tables):
+    subcat_cat, prod_subcat, cost, quantity, cost_others, quantity_others, period_len_df = tables
+    zero_columns = cost.columns[cost.sum() == 0]
+    cost = cost.drop(zero_columns, axis=1)
+    quantity = quantity.drop(zero_columns, axis=1)
+    prod_subcat = prod_subcat.drop(zero_columns, axis=0)
+    return subcat_cat, prod_subcat, cost, quantity, cost_others, quantity_others, period_len_df
 
+# Function to add the unit of each item to the prod_subcat dataframe (the "unit" column).
+# An item is measured in packs if all its quantities are integer.
+def add_item_units(tables):
+    subcat_cat, prod_subcat, cost, quantity, cost_others, quantity_others, period_len_df = tables
+    values = quantity.to_numpy(dtype=float)
+    packs = np.all(values.astype('int') == values, axis=0) & ~quantity.columns.isin(WEIGHED_ITEMS)
+    units = pd.Series(np.where(packs, 'pack', 'kg_l'), index=quantity.columns)
+    prod_subcat = prod_subcat.assign(
+        unit=pd.Categorical(units.loc[prod_subcat.index].values, categories=UNITS)
+    )
     return subcat_cat, prod_subcat, cost, quantity, cost_others, quantity_others, period_len_df
@@ -0,0 +1,176 @@
+import os
+import io
+import json
+import shutil
+import hashlib
+import pandas as pd
+
+import data_preprocessing
+
+# Directory to store snapshots of the preprocessed data
+SNAPSHOT_DIR = os.environ.get(
+    'SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'snapshot')
+)
+MANIFEST = 'manifest.json'
+
+# Names of the tables returned by the preprocessing function (in the same order).
+# Snapshots keep the tables of the preprocess_sheet function (items that have never been bought
+# are not deleted), so new columns of the sheet can be appended to them.
+TABLES_NAMES = [
+    'subcat_cat', 'prod_subcat', 'cost', 'quantity', 'cost_others', 'quantity_others', 'period_len_df'
+]
+
+# Content
+# 1. Snapshot key
+# 2. Write and read a snapshot
+# 3. Incremental preprocessing of new columns
+# 4. Load the preprocessed tables
+
+# 1. Snapshot key
+## 1.1. Version of the preprocessing code (any change of the module gives a new version)
+def preprocessing_version():
+    with open(data_preprocessing.__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+## 1.2. Key of the snapshot: the hash of the source file content and the preprocessing code version
+def snapshot_key(csv_content):
+    key = hashlib.sha256(csv_content)
+    key.update(preprocessing_version().encode())
+    return key.hexdigest()[:32]
+
+# 2. Write and read a snapshot
+## 2.1. Save one table in the feather format
+## (the index is saved as a column, columns' names are saved as strings)
+def write_table(df, path):
+    table = df.reset_index(drop=False)
+    table.columns = ['__index__'] + [str(col) for col in df.columns]
+    table.to_feather(path)
+    return {
+        'index_name' : df.index.name,
+        'columns_name' : df.columns.name,
+        'int_columns' : all(isinstance(col, int) for col in df.columns)
+    }
+
+## 2.2. Load one table saved by the write_table function
+def read_table(path, meta):
+    df = pd.read_feather(path).set_index('__index__')
+    df.index.name = meta['index_name']
+    if meta['int_columns']:
+        df.columns = [int(col) for col in df.columns]
+    df.columns.name = meta['columns_name']
+    return df
+
+## 2.3. Save all tables into the snapshot directory
+## (the manifest also keeps the code version, the sheet's header and the hashes of the sheet's columns).
+## The snapshot is written into a temporary directory and then renamed,
+## so other workers never see a partially written snapshot.
+def write_snapshot(path, tables, header, columns):
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    os.makedirs(tmp_path, exist_ok=True)
+    manifest = {
+        'version' : preprocessing_version(),
+        'header' : header,
+        'columns' : columns,
+        'tables' : {}
+    }
+    for name, df in zip(TABLES_NAMES, tables):
+        manifest['tables'][name] = write_table(df, os.path.join(tmp_path, name + '.feather'))
+    with open(os.path.join(tmp_path, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # another worker has already saved the same snapshot
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+## 2.4. Load the manifest of a snapshot
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+## 2.5. Load all tables from the snapshot directory
+def read_snapshot(path):
+    manifest = read_manifest(path)
+    return tuple(
+        read_table(os.path.join(path, name + '.feather'), manifest['tables'][name]) for name in TABLES_NAMES
+    )
+
+## 2.6. Delete snapshots with other keys (they are created for old data or old code)
+def delete_stale_snapshots(key):
+    for name in os.listdir(SNAPSHOT_DIR):
+        if name != key and '.tmp-' not in name:
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, name), ignore_errors=True)
+
+# 3. Incremental preprocessing of new columns
+## 3.1. Read the header of the sheet
+def read_header(csv_content):
+    return [str(col) for col in pd.read_csv(io.BytesIO(csv_content), delimiter=';', nrows=0).columns]
+
+## 3.2. Hashes of the sheet's columns (raw values as strings, so an edit of any cell changes the hash of its column)
+def columns_hashes(df):
+    return [
+        hashlib.sha256(pd.util.hash_pandas_object(df.iloc[:, i].astype(str), index=False).values.tobytes()).hexdigest()
+        for i in range(df.shape[1])
+    ]
+
+## 3.3. Find a snapshot created by the current preprocessing code for the previous version of the sheet
+def find_previous_snapshot():
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return None
+    version = preprocessing_version()
+    for name in os.listdir(SNAPSHOT_DIR):
+        path = os.path.join(SNAPSHOT_DIR, name)
+        try:
+            if '.tmp-' not in name and read_manifest(path).get('version') == version:
+                return path
+        except (OSError, ValueError):
+            continue
+    return None
+
+## 3.4. Preprocess only the columns added to the right of the sheet and append them
+## to the previous snapshot's tables. Returns None if the sheet has been changed in another way
+## (rows or values of existing columns are changed, the hashes of these columns are compared
+## with the manifest's ones), in this case the full preprocessing is needed.
+def append_new_columns(df, header, columns, previous_path):
+    manifest = read_manifest(previous_path)
+    old_header = manifest['header']
+    if len(header) <= len(old_header) or header[:len(old_header)] != old_header:
+        return None
+    if columns[:len(old_header)] != manifest.get('columns'):
+        return None
+    positions = [0, 1] + list(range(len(old_header), len(header)))
+    try:
+        new_tables = data_preprocessing.preprocess_sheet(df.iloc[:, positions])
+        return data_preprocessing.append_periods(read_snapshot(previous_path), new_tables)
+    except (ValueError, KeyError, IndexError):
+        return None
+
+# 4. Load the preprocessed tables:
+## Read the snapshot if it exists for the current data and code. Otherwise preprocess
+## only new columns of the sheet if there is a snapshot for its previous version,
+## or preprocess the full sheet, and save a new snapshot.
+def load_tables(csv_content):
+    key = snapshot_key(csv_content)
+    path = os.path.join(SNAPSHOT_DIR, key)
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        try:
+            return data_preprocessing.complete_tables(read_snapshot(path))
+        except (OSError, ValueError, KeyError):
+            # the snapshot is broken, so it will be rebuilt
+            shutil.rmtree(path, ignore_errors=True)
+    header = read_header(csv_content)
+    df = pd.read_csv(io.BytesIO(csv_content), delimiter=';')
+    columns = columns_hashes(df)
+    previous_path = find_previous_snapshot()
+    tables = append_new_columns(df, header, columns, previous_path) if previous_path else None
+    if tables is None:
+        tables = data_preprocessing.preprocess_sheet(df)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        write_snapshot(path, tables, header, columns)
+        delete_stale_snapshots(key)
+    except OSError:
+        # the file system is read-only, the app works without snapshots
+        pass
+    return data_preprocessing.complete_tables(tables)
@@ -0,0 +1,108 @@
+import os
+import json
+import requests
+
+# Directory with the data files bundled with the app
+LOCAL_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+# Directory to keep copies of the downloaded data files
+DOWNLOADS_DIR = os.environ.get('DATA_DOWNLOADS_DIR', os.path.join(LOCAL_DATA_DIR, 'downloads'))
+# URL of the data files in the GitHub repository
+GITHUB_DATA_URL = 'https://raw.githubusercontent.com/GhostOfMadness/dash-groceries-and-household-items-exp/main/data/'
+
+# Content
+# 1. Local files
+# 2. Files downloaded by URL (with the on-disk copy)
+# 3. Choose the data source
+
+# 1. Local files
+class LocalSource:
+    def __init__(self, directory=LOCAL_DATA_DIR):
+        self.directory = directory
+
+    def read_bytes(self, name):
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            return f.read()
+
+    def read_text(self, name):
+        return self.read_bytes(name).decode('utf-8')
+
+# 2. Files downloaded by URL:
+## The last downloaded version of each file is kept on disk with its ETag and Last-Modified values.
+## The next request is conditional, so the file is downloaded again only if it has been changed.
+## If the server is not available, the saved copy is used.
+class UrlSource:
+    def __init__(self, base_url=GITHUB_DATA_URL, directory=DOWNLOADS_DIR, timeout=10):
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.directory = directory
+        self.timeout = timeout
+
+    def _paths(self, name):
+        path = os.path.join(self.directory, name)
+        return path, path + '.meta.json'
+
+    def _read_copy(self, name):
+        path, meta_path = self._paths(name)
+        if not os.path.exists(path) or not os.path.exists(meta_path):
+            return None, {}
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('url') != self.base_url + name:
+            return None, {}
+        with open(path, 'rb') as f:
+            return f.read(), meta
+
+    def _write_copy(self, name, content, meta):
+        path, meta_path = self._paths(name)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for file_path, data in ((path, content), (meta_path, json.dumps(meta).encode())):
+                tmp_path = f'{file_path}.tmp-{os.getpid()}'
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, file_path)
+        except OSError:
+            # the file system is read-only, the file will be downloaded next time
+            pass
+
+    def read_bytes(self, name):
+        content, meta = self._read_copy(name)
+        headers = {}
+        if content is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            response = requests.get(self.base_url + name, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and content is not None:
+                return content
+            response.raise_for_status()
+        except requests.RequestException:
+            if content is not None:
+                return content
+            raise
+        meta = {
+            'url' : self.base_url + name,
+            'etag' : response.headers.get('ETag'),
+            'last_modified' : response.headers.get('Last-Modified')
+        }
+        self._write_copy(name, response.content, meta)
+        return response.content
+
+    def read_text(self, name):
+        return self.read_bytes(name).decode('utf-8')
+
+# 3. Choose the data source by the DATA_SOURCE environment variable:
+## "local" (by default) - files from the data directory of the app,
+## "github" - files from the GitHub repository,
+## a path to a directory - files from this directory,
+## any other value - the base URL of the data files.
+def get_data_source(value=None):
+    value = value or os.environ.get('DATA_SOURCE', 'local')
+    if value == 'local':
+        return LocalSource()
+    elif value == 'github':
+        return UrlSource(GITHUB_DATA_URL)
+    elif os.path.isdir(value):
+        return LocalSource(value)
+    return UrlSource(value)
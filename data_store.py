@@ -0,0 +1,201 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Maximal size of the payloads kept in memory by one worker (in characters of JSON strings)
+MAX_MEMORY_SIZE = int(os.environ.get('DATA_STORE_MAX_SIZE', 256 * 1024 * 1024))
+# Directory to spill payloads to, so they are shared across workers (not used if it is empty)
+SPILL_DIR = os.environ.get('DATA_STORE_DIR', '')
+# Payloads in the spill directory older than this number of seconds are deleted
+SPILL_MAX_AGE = int(os.environ.get('DATA_STORE_MAX_AGE', 24 * 60 * 60))
+# Number of queries kept by the cache of query results
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 1024))
+# Part of the memory limit used by decoded payloads (parsed JSON and tables)
+DECODED_PART = 0.25
+
+# Content
+# 1. Cache of decoded payloads
+# 2. Store of the callbacks' results
+# 3. Cache of query results
+# 4. Create the store
+
+# 1. Cache of decoded payloads:
+## Objects decoded from payloads (parsed JSON, tables) by their names in the LRU order.
+## The size of an object is estimated by the size of its source (in characters of the JSON string),
+## the total size is kept within the limit.
+class DecodedCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, name, source, decode):
+        with self.lock:
+            if name in self.values:
+                self.values.move_to_end(name)
+                return self.values[name][0]
+        value = decode(source)
+        size = len(source)
+        with self.lock:
+            if name not in self.values and size <= self.max_size:
+                self.values[name] = (value, size)
+                self.size += size
+                while self.size > self.max_size:
+                    _, (_, evicted_size) = self.values.popitem(last=False)
+                    self.size -= evicted_size
+        return value
+
+# 2. Store of the callbacks' results:
+## JSON payloads of the callbacks are kept on the server, dcc.Store components get only their keys
+## (the hash of the content). Payloads are kept in memory in the LRU order within the size limit,
+## pinned payloads (the same for all sessions) are never evicted. If the spill directory is set,
+## every payload is also written there, so any worker can read it by the key.
+## Decoded payloads are kept by the store's cache, its limit is a part of the store's memory limit.
+class DataStore:
+    def __init__(self, max_size=MAX_MEMORY_SIZE, directory=SPILL_DIR, max_age=SPILL_MAX_AGE):
+        self.decoded = DecodedCache(int(max_size * DECODED_PART))
+        self.max_size = max_size - self.decoded.max_size
+        self.directory = directory
+        self.max_age = max_age
+        self.size = 0
+        self.payloads = OrderedDict()
+        self.pinned = {}
+        self.lock = threading.Lock()
+        if self.directory:
+            self._delete_old_files()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def _delete_old_files(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            now = time.time()
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+        except OSError:
+            pass
+
+    def _write_file(self, key, payload):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        try:
+            tmp_path = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            # the file system is read-only, the payload is kept in memory only
+            pass
+
+    def _read_file(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _remember(self, key, payload):
+        if key in self.payloads:
+            self.payloads.move_to_end(key)
+            return
+        self.payloads[key] = payload
+        self.size += len(payload)
+        while self.size > self.max_size and len(self.payloads) > 1:
+            _, evicted = self.payloads.popitem(last=False)
+            self.size -= len(evicted)
+
+    def put(self, payload, pin=False):
+        key = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+        with self.lock:
+            if pin:
+                self.pinned[key] = payload
+            elif key not in self.pinned:
+                self._remember(key, payload)
+        if self.directory and not pin:
+            self._write_file(key, payload)
+        return key
+
+    # Returns the payload by the key or None if it has been evicted and is not in the spill directory
+    def get(self, key):
+        with self.lock:
+            if key in self.pinned:
+                return self.pinned[key]
+            if key in self.payloads:
+                self.payloads.move_to_end(key)
+                return self.payloads[key]
+        if not self.directory:
+            return None
+        payload = self._read_file(key)
+        if payload is not None:
+            with self.lock:
+                self._remember(key, payload)
+        return payload
+
+# 3. Cache of query results:
+## Keys of the store's payloads by the normalized parameters of the query (a tuple).
+## Payloads are kept by the store within its size limit, so the cache keeps only their keys
+## and an entry is dropped if its payload has been evicted from the store.
+class QueryCache:
+    def __init__(self, store, max_entries=QUERY_CACHE_SIZE):
+        self.store = store
+        self.max_entries = max_entries
+        self.keys = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, params):
+        with self.lock:
+            key = self.keys.get(params)
+        if key is not None and self.store.get(key) is None:
+            key = None
+        with self.lock:
+            if key is None:
+                self.keys.pop(params, None)
+                self.misses += 1
+            else:
+                if params in self.keys:
+                    self.keys.move_to_end(params)
+                self.hits += 1
+        return key
+
+    # Drops the entries with the key (its payload has been evicted from the store)
+    def discard(self, key):
+        with self.lock:
+            for params in [params for params, value in self.keys.items() if value == key]:
+                del self.keys[params]
+
+    def put(self, params, key):
+        with self.lock:
+            self.keys[params] = key
+            self.keys.move_to_end(params)
+            while len(self.keys) > self.max_entries:
+                self.keys.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'entries' : len(self.keys),
+                'hits' : self.hits,
+                'misses' : self.misses,
+                'hit_rate' : self.hits / requests if requests else 0.0
+            }
+
+# 4. Create the store with the parameters from the environment variables:
+## DATA_STORE_MAX_SIZE - the memory limit of one worker (for payloads and decoded payloads),
+## DATA_STORE_DIR - the spill directory shared by workers,
+## DATA_STORE_MAX_AGE - the lifetime of files in the spill directory (in seconds),
+## QUERY_CACHE_SIZE - the number of queries kept by the cache of query results.
+def get_data_store():
+    return DataStore()
+
+def get_query_cache(store):
+    return QueryCache(store)
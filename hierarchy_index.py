@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Content
+# 1. Index of the product hierarchy
+
+# 1. Index of the product hierarchy (item -> subcategory -> product type):
+## Items are coded by their positions in the tables' columns. Parallel arrays keep the code
+## of the subcategory for each item and the code of the product type for each subcategory,
+## so filters of the menu are boolean masks over items. Names are translated by the items' dictionary.
+class HierarchyIndex:
+    def __init__(self, items, prod_subcat, subcat_cat, items_dict):
+        item_subcategory, subcategories = pd.factorize(prod_subcat.loc[items, 'subcategory'])
+        subcategory_type, types = pd.factorize(subcat_cat.loc[subcategories, 'category'])
+        self.items = self._translate(items, items_dict)
+        # names are looked up by the hash index, so translated names of items must be unique
+        assert pd.Index(self.items).is_unique, 'Translated names of items are not unique'
+        self.subcategories = self._translate(subcategories, items_dict)
+        self.types = self._translate(types, items_dict)
+        self.item_subcategory = item_subcategory
+        self.item_type = subcategory_type[item_subcategory]
+
+    @staticmethod
+    def _translate(names, items_dict):
+        return np.array([items_dict[name] for name in names], dtype=object)
+
+    ## 1.1. Codes of items by their names (unknown names, e.g. values of the menu
+    ## in another language or selections saved before an update of the data, are dropped)
+    def codes(self, names):
+        codes = pd.Index(self.items).get_indexer(names)
+        return codes[codes != -1]
+
+    ## 1.2. Mask of items by their codes
+    def items_mask(self, codes):
+        mask = np.zeros(len(self.items), dtype=bool)
+        mask[codes] = True
+        return mask
+
+    ## 1.3. Mask of items from the subcategories
+    def subcategories_mask(self, names):
+        return np.isin(self.subcategories, names)[self.item_subcategory]
+
+    ## 1.4. Mask of items of the product type
+    def type_mask(self, name):
+        return (self.types == name)[self.item_type]
+
+    ## 1.5. Names of subcategories and product types of the items in the mask
+    def items_subcategories(self, mask):
+        return self.subcategories[np.unique(self.item_subcategory[mask])]
+
+    def items_types(self, mask):
+        return self.types[np.unique(self.item_type[mask])]
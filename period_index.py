@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Kinds of stores: all periods, hypermarkets (one-day periods) and supermarkets (other periods)
+STORE_KINDS = ['all', 'hyper', 'super']
+
+# Number of set bits in each byte value
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+# Content
+# 1. Index of periods with prefix sums and the presence bitmap
+
+# 1. Index of periods with prefix sums and the presence bitmap:
+## Rows of the cost and quantity tables are periods sorted by their ends. For each store kind
+## cumulative sums over periods are kept (with the zero row at the beginning), so the sum of any
+## range of periods is the difference of two rows. The range of periods is found by a binary search.
+## The bitmap keeps the items bought in each period (one bit for an item, 8 items in a byte).
+class PeriodIndex:
+    def __init__(self, cost, quantity, period_len_df):
+        self.dates = period_len_df.index
+        self.lengths = period_len_df[0].to_numpy()
+        self.columns = list(cost.columns)
+        self.masks = {
+            'all' : np.ones(len(self.dates), dtype=bool),
+            'hyper' : self.lengths == 0,
+            'super' : self.lengths != 0
+        }
+        tables = {
+            'cost' : cost.loc[self.dates, self.columns].to_numpy(dtype=float),
+            'quantity' : quantity.loc[self.dates, self.columns].to_numpy(dtype=float)
+        }
+        self.presence = np.packbits(tables['cost'] != 0, axis=1)
+        self.cumsums = {}
+        for kind, mask in self.masks.items():
+            self.cumsums[kind] = {
+                name : self._cumsum(values * mask[:, None]) for name, values in tables.items()
+            }
+            # the number of periods and days (a period of the length n has n + 1 days)
+            self.cumsums[kind]['periods'] = self._cumsum(mask.astype(int))
+            self.cumsums[kind]['days'] = self._cumsum((self.lengths + 1) * mask)
+
+    @staticmethod
+    def _cumsum(values):
+        cumsum = np.cumsum(values, axis=0)
+        return np.concatenate([np.zeros((1,) + cumsum.shape[1:], dtype=cumsum.dtype), cumsum])
+
+    ## 1.1. Positions of the first and the next after the last periods in the date range
+    def bounds(self, start, end):
+        start_pos = self.dates.searchsorted(pd.Timestamp(start), side='left')
+        end_pos = self.dates.searchsorted(pd.Timestamp(end), side='right')
+        return start_pos, max(start_pos, end_pos)
+
+    ## 1.2. Sum of values over the periods in the date range
+    ## (for the cost and quantity tables - the array of sums for each item)
+    def range_sum(self, start, end, store_kind, name):
+        start_pos, end_pos = self.bounds(start, end)
+        cumsum = self.cumsums[store_kind][name]
+        return cumsum[end_pos] - cumsum[start_pos]
+
+    ## 1.3. Ends of periods of the store kind in the date range
+    def periods(self, start, end, store_kind):
+        start_pos, end_pos = self.bounds(start, end)
+        return self.dates[start_pos:end_pos][self.masks[store_kind][start_pos:end_pos]]
+
+    ## 1.4. Items bought at least once in periods of the store kind in the date range
+    ## (the mask of items in the tables' columns order)
+    def available_items(self, start, end, store_kind):
+        start_pos, end_pos = self.bounds(start, end)
+        rows = self.presence[start_pos:end_pos][self.masks[store_kind][start_pos:end_pos]]
+        if len(rows) == 0:
+            return np.zeros(len(self.columns), dtype=bool)
+        bits = np.bitwise_or.reduce(rows, axis=0)
+        return np.unpackbits(bits, count=len(self.columns)).astype(bool)
+
+    ## 1.5. Number of items from the list of positions bought in each period
+    def items_counts(self, positions):
+        selection = np.zeros(len(self.columns), dtype=bool)
+        selection[positions] = True
+        return POPCOUNT[self.presence & np.packbits(selection)].sum(axis=1)
@@ -1,4 +1,4 @@
-import locale
+import functools
 from math import ceil
 import pandas as pd
 import numpy as np
@@ -7,90 +7,101 @@ from sklearn.linear_model import LinearRegression
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from dash.exceptions import PreventUpdate
-from dash import dash_table
+from dash import dash_table, Patch
 from dash.dash_table.Format import Format, Scheme, Symbol
 
+# Abbreviated names of months for ticks of the x-axis (the app does not depend on locales of the host)
+MONTHS = {
+    'English' : ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+    'Русский' : ['Янв', 'Фев', 'Мар', 'Апр', 'Май', 'Июн', 'Июл', 'Авг', 'Сен', 'Окт', 'Ноя', 'Дек']
+}
+# Number of date ranges with ticks of the x-axis kept in the cache
+TICKS_CACHE_SIZE = 64
+
+# Holidays shown on the graphs of values by period: the key in the labels' dictionary, the month and the day
+HOLIDAYS = [
+    ('christmas_holiday', 1, 7),
+    ('defender_day_holiday', 2, 23),
+    ('iwd_holiday', 3, 8),
+    ('son_birthday_holiday', 4, 4),
+    ('daughter_birthday_holiday', 4, 17),
+    ('worker_holiday', 5, 1),
+    ('victory_holiday', 5, 9),
+    ('mom_birthday_holiday', 5, 19),
+    ('dad_birthday_holiday', 10, 8),
+    ('unity_holiday', 11, 4),
+    ('new_year_holiday', 12, 31)
+]
+# Number of lines (values, the date range and the language) with holidays' markers kept in the cache
+HOLIDAYS_CACHE_SIZE = 256
+
 # Content
 # 1. Total expenses by period
 # 2. Items' cost shares and Items' quantity shares
 # 3. Others expenses table
-# 4. Items' number by period and Median cost per item by period (update by hover data)
-# 5. Interrelation between an items' number and a median cost per item
+# 4. Interrelation between an items' number and a median cost per item
 
 # 1. Total expenses by period
 ## 1.1. Ticks' values and positions on the x-axis
-def tick_vals_text_xaxis(df):
-    if df.index[0].month == 12:
-        start_date = f'{df.index[0].year + 1}-01-01'
-    elif df.index[0].month >= 9:
-        start_date = f'{df.index[0].year}-{df.index[0].month + 1}-01'
+def tick_vals_text_xaxis(df, lang):
+    return xaxis_ticks(df.index[0], df.index[-1], tuple(df.index.year.unique()), lang)
+
+@functools.lru_cache(maxsize=TICKS_CACHE_SIZE)
+def xaxis_ticks(first_date, last_date, unique_years, lang):
+    if first_date.month == 12:
+        start_date = f'{first_date.year + 1}-01-01'
+    elif first_date.month >= 9:
+        start_date = f'{first_date.year}-{first_date.month + 1}-01'
     else:
-        start_date = f'{df.index[0].year}-0{df.index[0].month + 1}-01'
-    if df.index[-1].month >= 10:
-        end_date = f'{df.index[-1].year}-{df.index[-1].month}-01'
+        start_date = f'{first_date.year}-0{first_date.month + 1}-01'
+    if last_date.month >= 10:
+        end_date = f'{last_date.year}-{last_date.month}-01'
     else:
-        end_date = f'{df.index[-1].year}-0{df.index[-1].month}-01'
+        end_date = f'{last_date.year}-0{last_date.month}-01'
     dates = pd.date_range(start=start_date, end=end_date, freq='MS').tolist()
-    unique_years = df.index.year.unique()
     start_year_i = [[d.year for d in dates].index(year) for year in unique_years]
     ticktext = []
     for i in range(len(dates)):
-        text = dates[i].strftime('%b').capitalize()
+        text = MONTHS[lang][dates[i].month - 1]
         if i in start_year_i:
             ticktext.append(text + f'<br>{dates[i].year}')
         else:
             ticktext.append(text)
     return dates, ticktext
 
-## 1.2. Determine neighboring values for a date in the array
-def find_borders(arr, x):
-    low, high, mid = 0, len(arr) - 1, 0
-    while high - low > 1:
-        mid = (low + high) // 2
-        if x < arr[mid]:
-            high = mid
-        elif x > arr[mid]:
-            low = mid
-        else:
-            low, high = mid, mid
-    return low, high
+## 1.2. Holidays' calendar: dates of holidays for the years (holidays in the order of the HOLIDAYS list,
+## years in the ascending order for each holiday) and positions of holidays in the list
+@functools.lru_cache(maxsize=HOLIDAYS_CACHE_SIZE)
+def holidays_calendar(years):
+    months = np.array([month for _, month, _ in HOLIDAYS])
+    days = np.array([day for _, _, day in HOLIDAYS])
+    years = np.array(years)
+    dates = pd.to_datetime(pd.DataFrame({
+        'year' : np.tile(years, len(HOLIDAYS)),
+        'month' : np.repeat(months, len(years)),
+        'day' : np.repeat(days, len(years))
+    })).to_numpy()
+    return dates, np.repeat(np.arange(len(HOLIDAYS)), len(years))
 
-## 1.3. Determine holidays' points positions and the annotation text for them
+## 1.3. Determine holidays' points positions and the annotation text for them:
+## holidays between the first and the last periods in the date range are placed on the line
+## (the value is linearly interpolated between the neighbouring periods)
 def add_holidays_dates(df, lang_dict):
     filtered_df = df[df['in_range'] == 1]
-    unique_years = df.index.year.unique()
-    holidays = {
-        lang_dict['christmas_holiday']: '07.01',
-        lang_dict['defender_day_holiday']: '23.02',
-        lang_dict['iwd_holiday']: '08.03',
-        lang_dict['son_birthday_holiday']: '04.04',
-        lang_dict['daughter_birthday_holiday']: '17.04',
-        lang_dict['worker_holiday'] : '01.05',
-        lang_dict['victory_holiday'] : '09.05',
-        lang_dict['mom_birthday_holiday']: '19.05',
-        lang_dict['dad_birthday_holiday']: '08.10',
-        lang_dict['unity_holiday'] : '04.11',
-        lang_dict['new_year_holiday']: '31.12'
-    }
-    holidays_dates = []
-    for h, d in holidays.items():
-        for year in unique_years:
-            date = pd.to_datetime(f'{d}.{year}', format='%d.%m.%Y')
-            if filtered_df.index[0] <= date <= filtered_df.index[-1]:
-                holidays_dates.append((h, date))
-    marker_positions = []
-    for hd in holidays_dates:
-        low, high = find_borders(filtered_df.index, hd[1])
-        b = filtered_df.iloc[low, 0]
-        if low != high:
-            k = (filtered_df.iloc[high, 0] - filtered_df.iloc[low, 0]) \
-            / (filtered_df.index[high] - filtered_df.index[low]).days
-        else:
-            k = 0
-        pos = k * (hd[1] - filtered_df.index[low]).days + b
-        marker_positions.append(pos)
-    return marker_positions, holidays_dates
+    names = tuple(lang_dict[key] for key, _, _ in HOLIDAYS)
+    return holidays_markers(
+        tuple(df.index.year.unique()), tuple(filtered_df.index.asi8), tuple(filtered_df[0].tolist()), names)
+
+@functools.lru_cache(maxsize=HOLIDAYS_CACHE_SIZE)
+def holidays_markers(years, dates, values, names):
+    dates = np.array(dates, dtype='datetime64[ns]')
+    calendar, holidays = holidays_calendar(years)
+    in_range = (calendar >= dates[0]) & (calendar <= dates[-1])
+    calendar, holidays = calendar[in_range], holidays[in_range]
+    marker_positions = np.interp(
+        calendar.astype('datetime64[D]').astype(float), dates.astype('datetime64[D]').astype(float), values)
+    holidays_dates = [(names[h], pd.Timestamp(d)) for h, d in zip(holidays, calendar)]
+    return marker_positions.tolist(), holidays_dates
 
 ## 1.4 Determine a word ending based on the value
 def word_ending(word, value):
@@ -108,82 +119,37 @@ def word_ending(word, value):
     return ending
 
 
-## 1.5. Create a single linear graph
-def one_linear_graph(fig, graph_type, df, start, end, period_df, name, lang_dict, bar_color, holiday_color, row=1, col=1, showlegend=True):
-    fig.add_trace(go.Bar(
-        x=df.index,
-        y=df[0],
-        marker_color=bar_color,
-        width=345600000,
-        hoverinfo='skip',
-        hovertemplate=None,
-        name=name,
-        showlegend=showlegend
-    ), row=row, col=col)
-    if name == lang_dict['store_kind_option_hyper']:
-        if graph_type == 'items_count':
-            text = []
-            for idx in df[df['in_range'] == 1].index:
-                items_word = lang_dict["items"] + word_ending(lang_dict["items"], df.loc[idx, 0])
-                line = f'<b>{df.loc[idx, 0]} {items_word}</b> {lang_dict["for"]} <i>{idx.strftime("%Y-%m-%d")}</i><extra></extra>'
-                text.append(line)
-        else:
-            text = [
-                f'<b>{df.loc[idx, 0]:.2f} {lang_dict["rubles"]}</b> {lang_dict["for"]} <i>{idx.strftime("%Y-%m-%d")}</i><extra></extra>'
-                for idx in df[df['in_range'] == 1].index
-            ]
+## 1.5. Hover text of the line for periods in the date range: the template is the same for all points,
+## values of a point are its y value, its date and the custom data (the word ending for the number of items
+## and the start date of a supermarkets' period)
+def range_line_template(graph_type, name, lang_dict):
+    if graph_type == 'items_count':
+        value = '<b>%{y} %{customdata[0]}</b>'
+        start_date = '%{customdata[1]}'
     else:
-        start_date_text = [
-            (i - timedelta(days=int(period_df.loc[i][0]))).strftime('%Y-%m-%d') for i in df[df['in_range'] == 1].index
-        ]
-        text = []
-        for i in range(len(df[df['in_range'] == 1].index)):
-            end_date_i = df[df['in_range'] == 1].index[i].strftime('%Y-%m-%d')
-            value = df[df['in_range'] == 1].iloc[i, 0]
-            if graph_type == 'items_count':
-                items_word = lang_dict["items"] + word_ending(lang_dict["items"], value)
-                line = f'<b>{value} {items_word}</b> {lang_dict["for_period"]}<extra></extra><br>{lang_dict["from"]} <i>{start_date_text[i]}</i> {lang_dict["to"]} <i>{end_date_i}</i>'
-            else:
-                line = f'<b>{value:.2f} {lang_dict["rubles"]}</b> {lang_dict["for_period"]}<extra></extra><br>{lang_dict["from"]} <i>{start_date_text[i]}</i> {lang_dict["to"]} <i>{end_date_i}</i>'
-            text.append(line)
-    fig.add_trace(go.Scatter(
-        x=df[df['in_range'] == 1].index,
-        y=df[df['in_range'] == 1][0],
-        mode='lines+markers',
-        line=dict(color='#382250', dash='dot', width=2),
-        hovertemplate='%{text}',
-        text=text,
-        hoverlabel = {
-            'bgcolor' : '#FFFFFF',
-            'font_size' : 16,
-            'bordercolor' : '#000000',
-            'font_family' : 'Source Sans Pro, sans-serif'
-        },
-        showlegend=False
-    ), row=row, col=col)
-    marker_positions = add_holidays_dates(df, lang_dict)[0]
-    holidays_dates = add_holidays_dates(df, lang_dict)[1]
-    fig.add_trace(
-        go.Scatter(
-            x=[hd[1] for hd in holidays_dates],
-            y=marker_positions,
-            mode='markers',
-            marker_symbol='star',
-            marker_line_color='#382250',
-            marker_color=holiday_color,
-            marker_size=8,
-            marker_line_width=1,
-            hovertemplate='<b>%{text}</b><br><i>%{x|%Y-%m-%d}</i><extra></extra>',
-            text=[hd[0] for hd in holidays_dates],
-            hoverlabel = {
-                'bgcolor' : '#FFFFFF',
-                'font_size' : 16,
-                'bordercolor' : '#000000',
-                'font_family' : 'Source Sans Pro, sans-serif'
-            },
-            showlegend=False
-        ), row=row, col=col
-    )
+        value = f'<b>%{{y:.2f}} {lang_dict["rubles"]}</b>'
+        start_date = '%{customdata[0]}'
+    if name == lang_dict['store_kind_option_hyper']:
+        return f'{value} {lang_dict["for"]} <i>%{{x|%Y-%m-%d}}</i><extra></extra>'
+    return f'{value} {lang_dict["for_period"]}<extra></extra><br>{lang_dict["from"]} <i>{start_date}</i> {lang_dict["to"]} <i>%{{x|%Y-%m-%d}}</i>'
+
+def range_line_customdata(graph_type, df, period_df, name, lang_dict):
+    in_range_data = df[df['in_range'] == 1]
+    columns = []
+    if graph_type == 'items_count':
+        values = in_range_data[0].tolist()
+        endings = {value : word_ending(lang_dict['items'], value) for value in set(values)}
+        columns.append([lang_dict['items'] + endings[value] for value in values])
+    if name != lang_dict['store_kind_option_hyper']:
+        start_dates = in_range_data.index - pd.to_timedelta(period_df.loc[in_range_data.index, 0].to_numpy(), unit='D')
+        columns.append(start_dates.strftime('%Y-%m-%d').tolist())
+    if len(columns) == 0:
+        return None
+    return [list(row) for row in zip(*columns)]
+
+## 1.6. Add rectangles of the maximal and minimal values and rectangles dimming periods out of the date range
+## (the subplot can be empty when only rectangles are updated)
+def add_range_shapes(fig, df, start, end, lang_dict, row=1, col=1):
     max_sum = df[df['in_range'] == 1][0].max()
     max_sum_date = df[(df[0] == max_sum) & (df['in_range'] == 1)].index[0]
     fig.add_vrect(
@@ -199,7 +165,7 @@ def one_linear_graph(fig, graph_type, df, start, end, period_df, name, lang_dict
         annotation_borderwidth=1,
         annotation_bordercolor='#382250',
         annotation_bgcolor='#FFFFFF',
-        row=row, col=col
+        row=row, col=col, exclude_empty_subplots=False
     )
     min_sum = df[df['in_range'] == 1][0].min()
     min_sum_date = df[(df[0] == min_sum) & (df['in_range'] == 1)].index[0]
@@ -216,7 +182,7 @@ def one_linear_graph(fig, graph_type, df, start, end, period_df, name, lang_dict
         annotation_borderwidth=1,
         annotation_bordercolor='#382250',
         annotation_bgcolor='#FFFFFF',
-        row=row, col=col
+        row=row, col=col, exclude_empty_subplots=False
     )
     if df[df['in_range'] == 1].index[0] != df.index[0]:
         fig.add_vrect(
@@ -225,7 +191,7 @@ def one_linear_graph(fig, graph_type, df, start, end, period_df, name, lang_dict
             fillcolor='#FFFFFF',
             line_width=0,
             opacity=0.65,
-            row=row, col=col
+            row=row, col=col, exclude_empty_subplots=False
         )
     if df[df['in_range'] == 1].index[-1] != df.index[-1]:
         fig.add_vrect(
@@ -234,9 +200,61 @@ def one_linear_graph(fig, graph_type, df, start, end, period_df, name, lang_dict
             fillcolor='#FFFFFF',
             line_width=0,
             opacity=0.65,
-            row=row, col=col
+            row=row, col=col, exclude_empty_subplots=False
         )
-## 1.6 Modify rounding function
+
+## 1.7. Create a single linear graph
+def one_linear_graph(fig, graph_type, df, start, end, period_df, name, lang_dict, bar_color, holiday_color, row=1, col=1, showlegend=True):
+    fig.add_trace(go.Bar(
+        x=df.index,
+        y=df[0],
+        marker_color=bar_color,
+        width=345600000,
+        hoverinfo='skip',
+        hovertemplate=None,
+        name=name,
+        showlegend=showlegend
+    ), row=row, col=col)
+    fig.add_trace(go.Scatter(
+        x=df[df['in_range'] == 1].index,
+        y=df[df['in_range'] == 1][0],
+        mode='lines+markers',
+        line=dict(color='#382250', dash='dot', width=2),
+        hovertemplate=range_line_template(graph_type, name, lang_dict),
+        customdata=range_line_customdata(graph_type, df, period_df, name, lang_dict),
+        hoverlabel = {
+            'bgcolor' : '#FFFFFF',
+            'font_size' : 16,
+            'bordercolor' : '#000000',
+            'font_family' : 'Source Sans Pro, sans-serif'
+        },
+        showlegend=False
+    ), row=row, col=col)
+    marker_positions, holidays_dates = add_holidays_dates(df, lang_dict)
+    fig.add_trace(
+        go.Scatter(
+            x=[hd[1] for hd in holidays_dates],
+            y=marker_positions,
+            mode='markers',
+            marker_symbol='star',
+            marker_line_color='#382250',
+            marker_color=holiday_color,
+            marker_size=8,
+            marker_line_width=1,
+            hovertemplate='<b>%{text}</b><br><i>%{x|%Y-%m-%d}</i><extra></extra>',
+            text=[hd[0] for hd in holidays_dates],
+            hoverlabel = {
+                'bgcolor' : '#FFFFFF',
+                'font_size' : 16,
+                'bordercolor' : '#000000',
+                'font_family' : 'Source Sans Pro, sans-serif'
+            },
+            showlegend=False
+        ), row=row, col=col
+    )
+    add_range_shapes(fig, df, start, end, lang_dict, row=row, col=col)
+
+## 1.8 Modify rounding function
 def round_function(k):
     if k < 1:
         return 1
@@ -247,23 +265,24 @@ def round_function(k):
     elif k < 100000:
         return ceil(k / 100) * 100
 
-## 1.7. Create full linear graph:
-## If the shop kind value is "All", create two single linear graphs with the shared x-axis.
-## Draw one single graph in other cases.
-def linear_graph(df, period_df, start_date_hyper, end_date_hyper, start_date_super, end_date_super, items, lang, sk_value, lang_dict, graph_type):
-    if lang == 'English':
-        locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
-    else:
-        locale.setlocale(locale.LC_ALL, 'ru_RU.UTF-8')
-
-    N = 4
-    dff = df[items].sum(axis=1).to_frame() if graph_type == 'cost_count' else df
-    hyper_data = dff.loc[period_df[period_df[0] == 0].index]
+## 1.9. Split values into hypermarkets' and supermarkets' periods
+## and mark periods in the date range
+def linear_graph_data(df, period_df, start_date_hyper, end_date_hyper, start_date_super, end_date_super):
+    hyper_data = df.loc[period_df[period_df[0] == 0].index]
     hyper_data['in_range'] = [
         1 if start_date_hyper <= i <= end_date_hyper else 0 for i in hyper_data.index]
-    super_data = dff.loc[period_df[period_df[0] != 0].index]
+    super_data = df.loc[period_df[period_df[0] != 0].index]
     super_data['in_range'] = [
         1 if start_date_super <= i <= end_date_super else 0 for i in super_data.index]
+    return hyper_data, super_data
+
+## 1.10. Create full linear graph:
+## If the shop kind value is "All", create two single linear graphs with the shared x-axis.
+## Draw one single graph in other cases.
+def linear_graph(df, period_df, start_date_hyper, end_date_hyper, start_date_super, end_date_super, lang, sk_value, lang_dict, graph_type):
+    N = 4
+    hyper_data, super_data = linear_graph_data(
+        df, period_df, start_date_hyper, end_date_hyper, start_date_super, end_date_super)
     hyper_step = round_function(hyper_data[0].max() / N)
     super_step = round_function(super_data[0].max() / N)
     if graph_type == 'cost_count':
@@ -282,8 +301,8 @@ def linear_graph(df, period_df, start_date_hyper, end_date_hyper, start_date_sup
             lang_dict, 'rgba(179, 112, 112, 1)', '#7E7EE4', row=2, col=1)
         fig.update_xaxes(
             title_text=f'<b>{lang_dict["date"]}</b>',
-            tickvals=tick_vals_text_xaxis(super_data)[0],
-            ticktext=tick_vals_text_xaxis(super_data)[1],
+            tickvals=tick_vals_text_xaxis(super_data, lang)[0],
+            ticktext=tick_vals_text_xaxis(super_data, lang)[1],
             tickfont=dict(size=14, color='#000000'),
             title=dict(font_size=16, standoff=10, font_color='#000000'),
             row=2, col=1
@@ -305,8 +324,8 @@ def linear_graph(df, period_df, start_date_hyper, end_date_hyper, start_date_sup
             lang_dict, 'rgba(244, 196, 79, 1)', '#0D57B2', row=1, col=1, showlegend=False)
         fig.update_xaxes(
             title_text=f'<b>{lang_dict["date"]}</b>',
-            tickvals=tick_vals_text_xaxis(hyper_data)[0],
-            ticktext=tick_vals_text_xaxis(hyper_data)[1],
+            tickvals=tick_vals_text_xaxis(hyper_data, lang)[0],
+            ticktext=tick_vals_text_xaxis(hyper_data, lang)[1],
             tickfont=dict(size=14, color='#000000'),
             title=dict(font_size=16, standoff=10, font_color='#000000'),
             row=1, col=1
@@ -323,8 +342,8 @@ def linear_graph(df, period_df, start_date_hyper, end_date_hyper, start_date_sup
             lang_dict, 'rgba(179, 112, 112, 1)', '#7E7EE4', row=1, col=1, showlegend=False)
         fig.update_xaxes(
             title_text=f'<b>{lang_dict["date"]}</b>',
-            tickvals=tick_vals_text_xaxis(super_data)[0],
-            ticktext=tick_vals_text_xaxis(super_data)[1],
+            tickvals=tick_vals_text_xaxis(super_data, lang)[0],
+            ticktext=tick_vals_text_xaxis(super_data, lang)[1],
             tickfont=dict(size=14, color='#000000'),
             title=dict(font_size=16, standoff=10, font_color='#000000'),
             row=1, col=1
@@ -373,263 +392,214 @@ def linear_graph(df, period_df, start_date_hyper, end_date_hyper, start_date_sup
         ))
     return fig
 
+## 1.11. Update the date range of the full linear graph:
+## bars, axes and the layout do not depend on the date range, so only the line of periods in the range,
+## holidays' markers and rectangles are sent to the graph created by the linear_graph function
+## with the same values and the store kind (a partial update of the figure).
+def linear_graph_range_patch(df, period_df, start_date_hyper, end_date_hyper, start_date_super, end_date_super, sk_value, lang_dict, graph_type):
+    hyper_data, super_data = linear_graph_data(
+        df, period_df, start_date_hyper, end_date_hyper, start_date_super, end_date_super)
+    hyper_graph = (hyper_data, start_date_hyper, end_date_hyper, lang_dict['store_kind_option_hyper'])
+    super_graph = (super_data, start_date_super, end_date_super, lang_dict['store_kind_option_super'])
+    if sk_value == lang_dict['store_kind_option_all']:
+        graphs = [hyper_graph, super_graph]
+    elif sk_value == lang_dict['store_kind_option_hyper']:
+        graphs = [hyper_graph]
+    else:
+        graphs = [super_graph]
+
+    ## rectangles are added to an empty figure with the same subplots to get their axes references
+    fig = make_subplots(rows=len(graphs), cols=1, shared_xaxes=True)
+    patch = Patch()
+    for i, (data, start, end, name) in enumerate(graphs):
+        in_range_data = data[data['in_range'] == 1]
+        patch['data'][3 * i + 1]['x'] = in_range_data.index.to_pydatetime().tolist()
+        patch['data'][3 * i + 1]['y'] = in_range_data[0].tolist()
+        customdata = range_line_customdata(graph_type, data, period_df, name, lang_dict)
+        if customdata is not None:
+            patch['data'][3 * i + 1]['customdata'] = customdata
+        marker_positions, holidays_dates = add_holidays_dates(data, lang_dict)
+        patch['data'][3 * i + 2]['x'] = [hd[1].to_pydatetime() for hd in holidays_dates]
+        patch['data'][3 * i + 2]['y'] = marker_positions
+        patch['data'][3 * i + 2]['text'] = [hd[0] for hd in holidays_dates]
+        add_range_shapes(fig, data, start, end, lang_dict, row=i + 1, col=1)
+    patch['layout']['shapes'] = [shape.to_plotly_json() for shape in fig.layout.shapes]
+    patch['layout']['annotations'] = [annotation.to_plotly_json() for annotation in fig.layout.annotations]
+    return patch
+
 # 2. Items' cost shares and Items' quantity shares
-## 2.1 Determine labels for a sunburst plot
-def labels_for_sunburst(items, prod_subcat_data, subcat_cat_data, last_value):
-    categories = prod_subcat_data.loc[items, 'subcategory'].unique().tolist()
-    types = subcat_cat_data.loc[
-        prod_subcat_data.loc[items, 'subcategory'].unique(), 'category'
-    ].unique().tolist()
-    labels = [
-        *items,
-        *categories,
-        *types,
-        *[last_value]
-    ]
-    return labels, len(categories), len(types)
+## 2.1 Determine the hierarchy of labels for sunburst plots: items, subcategories, product types and the last label.
+## Columns of item values (values, numbers of items and of items with the partially known quantity for each plot)
+## are summed by subcategories and types with group-bys over the item -> subcategory -> type columns,
+## levels of labels are 0 for items, 1 for subcategories, 2 for types and 3 for the last label.
+## Labels are in the post-order (each label follows its descendants), so every subtree is a range of rows.
+def sunburst_hierarchy(item_values, prod_subcat_data, subcat_cat_data, last_label):
+    item_subcats = prod_subcat_data.loc[item_values.index, 'subcategory'].to_numpy()
+    item_types = subcat_cat_data.loc[item_subcats, 'category'].to_numpy()
+    subcat_values = item_values.groupby(item_subcats, sort=False).sum()
+    type_values = item_values.groupby(item_types, sort=False).sum()
+    subcat_types = subcat_cat_data.loc[subcat_values.index, 'category'].to_numpy()
+    hierarchy = pd.DataFrame({
+        'parent' : [*item_subcats, *subcat_types, *[last_label] * len(type_values), ''],
+        **{col : np.concatenate([
+            item_values[col].to_numpy(), subcat_values[col].to_numpy(), type_values[col].to_numpy(),
+            [item_values[col].sum()]
+        ]) for col in item_values.columns}
+    }, index=[*item_values.index, *subcat_values.index, *type_values.index, last_label])
+    sizes = [len(item_values), len(subcat_values), len(type_values), 1]
+    levels = np.repeat([0, 1, 2, 3], sizes)
 
-## 2.2 Determine displayed labels for a sunburst plot
-def showing_labels_for_sunburst(labels, prod_subcat_data, subcat_cat_data):
-    showing_labels = []
-    for label in labels:
-        if label in prod_subcat_data.index:
-            showing_labels.append(label if len(label) <= 15 else label[:12] + '...')
-        elif label in subcat_cat_data.index:
-            space_pos = label.find(' ')
-            showing_labels.append(
-                label if space_pos == -1 or len(label) <= 10 else label[:space_pos] + '<br>' + label[space_pos+1:])
-        else:
-            showing_labels.append(label)
-    return showing_labels
+    # sort labels by the codes of their type, subcategory and item (codes of higher labels are the maximal ones)
+    last_code = len(item_values)
+    type_codes = np.concatenate([
+        pd.factorize(item_types)[0], type_values.index.get_indexer(subcat_types),
+        np.arange(len(type_values)), [last_code]])
+    subcat_codes = np.concatenate([
+        pd.factorize(item_subcats)[0], np.arange(len(subcat_values)),
+        np.full(len(type_values) + 1, last_code)])
+    item_codes = np.concatenate([np.arange(len(item_values)), np.full(sum(sizes[1:]), last_code)])
+    order = np.lexsort((item_codes, subcat_codes, type_codes))
+    return hierarchy.iloc[order], levels[order]
 
-## 2.3 Determine a "parent" label for each label of a sunburst plot
-def parents_for_sunburst(labels, prod_subcat_data, subcat_cat_data):
-    parents = []
-    for label in labels:
-        if label in prod_subcat_data.index:
-            parents.append(prod_subcat_data.loc[label, 'subcategory'])
-        elif label in subcat_cat_data.index:
-            parents.append(subcat_cat_data.loc[label, 'category'])
-        elif label in subcat_cat_data['category'].unique():
-            parents.append(labels[-1])
-        else:
-            parents.append('')
-    return parents
+## 2.2 Determine the tree index of a sunburst table: the position of the "parent" label (-1 for the center)
+## and the position of the first row of the label's subtree (the label itself for leaves)
+def sunburst_tree_index(parents, labels, levels):
+    parent_pos = pd.Index(labels).get_indexer(parents)
+    subtree_start = np.arange(len(labels))
+    for level in range(3):
+        children = (levels == level) & (parent_pos != -1)
+        np.minimum.at(subtree_start, parent_pos[children], subtree_start[children])
+    return parent_pos, subtree_start
 
-## 2.4 Determine a value for each label of a sunburst plot
-def values_for_sunburst(df, items_in_units, labels, prod_subcat_data, subcat_cat_data):
-    values = []
-    for label in labels:
-        if label in prod_subcat_data.index:
-            values.append(df[label].sum())
-        elif label in subcat_cat_data.index:
-            selected_pos = [
-                pos for pos in prod_subcat_data[prod_subcat_data['subcategory'] == label].index \
-                if pos in items_in_units
-            ]
-            values.append(df[selected_pos].sum().sum())
-        elif label in subcat_cat_data['category'].unique():
-            subcats = subcat_cat_data[subcat_cat_data['category'] == label].index
-            selected_pos = []
-            for subcat in subcats:
-                positions = prod_subcat_data[prod_subcat_data['subcategory'] == subcat].index
-                for pos in positions:
-                    if pos in items_in_units:
-                        selected_pos.append(pos)
-            values.append(df[selected_pos].sum().sum())
-        else:
-            values.append(df[items_in_units].sum().sum())
-    return values
+## 2.3 Determine a displayed label by the label's level
+def showing_label_for_sunburst(label, level):
+    if level == 0:
+        return label if len(label) <= 15 else label[:12] + '...'
+    if level == 1:
+        space_pos = label.find(' ')
+        return label if space_pos == -1 or len(label) <= 10 else label[:space_pos] + '<br>' + label[space_pos+1:]
+    return label
 
-## 2.5 Helper function to correct label's hover text
+## 2.4 Helper function to correct label's hover text
 def correct_hovertext(text, explanation):
     colon = text.find(':')
     text = text[:colon] + '*' + text[colon:]
     text += f'<br>* - {explanation}'
     return text
 
-## 2.6 Determine hover text for each label of a sunburst plot
-def hovertext_for_sunburst(labels, parents, values, prod_subcat_data,
-                           subcat_cat_data, total_text, cat_num, type_num, graph_type,
-                           part_quantity, lang_dict):
-    hovertext = [''] * len(labels)
-    for i in range(len(labels)):
-        total_sum = values[-1]
-        if graph_type == 'cost':
-            value_format = f'{values[i]:,.2f} ' + lang_dict['rubles']
-        elif graph_type == 'vol':
-            value_format = f'{values[i]:,.3f} ' + lang_dict['kg_l']
-        elif graph_type == 'pack':
-            value_format = f'{values[i]:} ' + lang_dict['packs']
-        if total_sum != 0:
-            if labels[i] in prod_subcat_data.index:
-                cat_sum = values[labels.index(parents[i])]
-                if cat_num == 1:
-                    hovertext[i] = '<br>'.join([
-                        labels[i] + ':',
-                        value_format,
-                        f'{(values[i] / cat_sum):.2%} {lang_dict["of_category"]}'
-                    ])
-                    if graph_type != 'cost' and labels[i] in part_quantity:
-                        hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
-                else:
-                    type_sum = values[labels.index(parents[labels.index(parents[i])])]
-                    if type_num == 1:
-                        hovertext[i] = '<br>'.join([
-                            labels[i] + ':',
-                            value_format,
-                            f'{(values[i] / cat_sum):.2%} {lang_dict["of_category"]}',
-                            f'{(values[i] / type_sum):.2%} {lang_dict["of_type"]}',
-                        ])
-                        if graph_type != 'cost' and labels[i] in part_quantity:
-                            hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
-                    else:
-                        hovertext[i] = '<br>'.join([
-                            labels[i] + ':',
-                            value_format,
-                            f'{(values[i] / cat_sum):.2%} {lang_dict["of_category"]}',
-                            f'{(values[i] / type_sum):.2%} {lang_dict["of_type"]}',
-                            f'{(values[i] / total_sum):.2%} {total_text}'
-                        ])
-                        if graph_type != 'cost' and labels[i] in part_quantity:
-                            hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
-            elif labels[i] in subcat_cat_data.index:
-                if cat_num == 1:
-                    hovertext[i] = '<br>'.join([
-                            labels[i] + ':',
-                            value_format,
-                    ])
-                    if graph_type != 'cost' and labels[i] in part_quantity:
-                        hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
-                else:
-                    type_sum = values[labels.index(parents[i])]
-                    if type_num == 1:
-                        hovertext[i] = '<br>'.join([
-                            labels[i] + ':',
-                            value_format,
-                            f'{(values[i] / type_sum):.2%} {lang_dict["of_type"]}'
-                        ])
-                        if graph_type != 'cost' and labels[i] in part_quantity:
-                            hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
-                    else:
-                        hovertext[i] = '<br>'.join([
-                            labels[i] + ':',
-                            value_format,
-                            f'{(values[i] / type_sum):.2%} {lang_dict["of_type"]}',
-                            f'{(values[i] / total_sum):.2%} {total_text}'
-                        ])
-                        if graph_type != 'cost' and labels[i] in part_quantity:
-                            hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
-            elif labels[i] in subcat_cat_data['category'].unique():
-                if type_num == 1:
-                    hovertext[i] = '<br>'.join([
-                            labels[i] + ':',
-                            value_format,
-                    ])
-                    if graph_type != 'cost' and labels[i] in part_quantity:
-                        hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
-                else:
-                    hovertext[i] = '<br>'.join([
-                        labels[i] + ':',
-                        value_format,
-                        f'{(values[i] / total_sum):.2%} {total_text}'
-                    ])
-                    if graph_type != 'cost' and labels[i] in part_quantity:
-                        hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
-            else:
-                hovertext[i] = '<br>'.join([
-                        labels[i] + ':',
-                        value_format,
-                ])
-                if graph_type != 'cost' and labels[i] in part_quantity:
-                    hovertext[i] = correct_hovertext(hovertext[i], lang_dict['explanation'])
+## 2.5 Determine hover text for each label of a sunburst plot
+## (shares of the subcategory, the type and the total are shown for the levels below them)
+def hovertext_for_sunburst(labels, levels, values, parent_values, type_values, total_text,
+                           cat_num, type_num, graph_type, part_quantity, lang_dict):
+    total_sum = values[-1]
+    if total_sum == 0:
+        return [''] * len(labels)
+    value_format = {
+        'cost' : '{:,.2f} ' + lang_dict['rubles'],
+        'vol' : '{:,.3f} ' + lang_dict['kg_l'],
+        'pack' : '{} ' + lang_dict['packs']
+    }[graph_type]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        category_shares = (values / parent_values).tolist()
+        type_shares = (values / type_values).tolist()
+        total_shares = (values / total_sum).tolist()
+    hovertext = []
+    for i, (label, level, value) in enumerate(zip(labels, levels.tolist(), values.tolist())):
+        lines = [label + ':', value_format.format(value)]
+        if level == 0:
+            lines.append(f'{category_shares[i]:.2%} {lang_dict["of_category"]}')
+        if level <= 1 and cat_num != 1:
+            lines.append(f'{type_shares[i]:.2%} {lang_dict["of_type"]}')
+        if level <= 2 and cat_num != 1 and type_num != 1:
+            lines.append(f'{total_shares[i]:.2%} {total_text}')
+        text = '<br>'.join(lines)
+        if graph_type != 'cost' and part_quantity[i]:
+            text = correct_hovertext(text, lang_dict['explanation'])
+        hovertext.append(text)
     return hovertext
 
-## 2.7 Determine a color value for each label of a sunburst plot
-def colors_for_sunburst(labels, parents, values):
-    colors = [
-        values[i] / values[labels.index(parents[i])] if parents[i] != '' else 1 \
-        for i in range(len(labels))
-    ]
-    return colors
-
-## 2.8 Helper function to find all labels from the current one to the node
-def find_item_parents(item, df):
-    result = []
-    if df.loc[item, 'parent'] == '':
-        return [item]
-    else:
-        result += [item]
-        result += find_item_parents(df.loc[item, 'parent'], df)
-    return result
-
-
-## 2.9 Create a dataframe for a sunburst plot
-def sunburst_dataframe(cleaned_cost_df, cleaned_quantity_df, items_in_units, prod_subcat_data,
-    subcat_cat_data, last_label, of_total_text, graph_type, lang_dict):
-
-    # determine which dataframe should be used
-    if graph_type == 'cost':
-        cleaned_df = cleaned_cost_df
-    else:
-        cleaned_df = cleaned_quantity_df
-
-    # determine items in the right units
-    items = [col for col in cleaned_df.columns if col in items_in_units]
-
-    # determine labels
-    labels, cat_num, type_num = labels_for_sunburst(
-        items, prod_subcat_data, subcat_cat_data, last_label)
-    showing_labels = showing_labels_for_sunburst(labels, prod_subcat_data, subcat_cat_data)
-
-    # determine "parent" labels
-    parents = parents_for_sunburst(labels, prod_subcat_data, subcat_cat_data)
-    showing_parents = showing_labels_for_sunburst(parents, prod_subcat_data, subcat_cat_data)
-
-    # determine the value for each label
-    values = values_for_sunburst(
-        cleaned_df, items, labels, prod_subcat_data, subcat_cat_data
-    )
-
-    # create the dataframe
+## 2.6 Create a dataframe for a sunburst plot from the hierarchy of labels
+## (labels without items in the plot's units are dropped)
+def sunburst_dataframe(hierarchy, levels, of_total_text, graph_type, lang_dict):
+    in_plot = hierarchy[graph_type + '_items'].to_numpy() > 0
+    in_plot[-1] = True
     sunburst_data = pd.DataFrame({
-        'parent' : parents,
-        'value' : values,
-        'showing_label' : showing_labels,
-        'showing_parent' : showing_parents
-    }, index=labels)
+        'parent' : hierarchy['parent'],
+        'value' : hierarchy[graph_type],
+        'showing_label' : hierarchy['showing_label'],
+        'showing_parent' : hierarchy['showing_parent']
+    })[in_plot]
+    partial = hierarchy[graph_type + '_partial'].to_numpy()[in_plot] > 0
+    levels = levels[in_plot]
+    cat_num = (levels == 1).sum()
+    type_num = (levels == 2).sum()
 
+    # the single subcategory or the single type becomes the center of the plot
     if cat_num == 1:
         sunburst_data = sunburst_data.iloc[:-2, :]
-        sunburst_data.iloc[-1, [0, 3]] = ''
     elif type_num == 1:
         sunburst_data = sunburst_data.iloc[:-1, :]
-        sunburst_data.iloc[-1, [0, 3]] = ''
+    levels = levels[:len(sunburst_data)]
+    sunburst_data.iloc[-1, [0, 3]] = ''
+
+    # values of "parent" labels and types by the tree index
+    labels = sunburst_data.index.tolist()
+    parents = sunburst_data['parent'].tolist()
+    values = sunburst_data['value'].to_numpy()
+    parent_pos, subtree_start = sunburst_tree_index(parents, labels, levels)
+    parent_values = values[parent_pos]
+    type_values = np.where(levels == 0, values[parent_pos[parent_pos]], parent_values)
+
+    # labels with the partially known quantity: items and all their "parent" labels
+    part_quantity = partial[:len(labels)]
 
     # determine the hover text for each label
-    part_quantity_items = [
-        item for item in items if not np.all(cleaned_quantity_df[cleaned_cost_df[item] != 0][item] != 0)
-    ]
-    part_quantity = []
-    for i in part_quantity_items:
-        part_quantity += find_item_parents(i, sunburst_data)
-    part_quantity = list(set(part_quantity))
-    hovertext = hovertext_for_sunburst(
-        list(sunburst_data.index), sunburst_data['parent'].values, sunburst_data['value'].values,
-        prod_subcat_data, subcat_cat_data, of_total_text, cat_num, type_num, graph_type, part_quantity,
-        lang_dict
+    sunburst_data['hovertext'] = hovertext_for_sunburst(
+        labels, levels, values, parent_values, type_values, of_total_text,
+        cat_num, type_num, graph_type, part_quantity, lang_dict
     )
-    sunburst_data['hovertext'] = hovertext
 
-    # determine the color value for each label
-    colors = colors_for_sunburst(
-        list(sunburst_data.index), sunburst_data['parent'].values, sunburst_data['value'].values)
-    sunburst_data['color'] = colors
+    # determine the color value for each label (the share of the "parent" label's value)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sunburst_data['color'] = np.where(parent_pos != -1, values / parent_values, 1)
+
+    sunburst_data['parent_pos'] = parent_pos
+    sunburst_data['subtree_start'] = subtree_start
 
     return sunburst_data
 
+## 2.7 Create dataframes for the items' cost shares plot and the items' quantity shares plots
+## (in kilograms or litres and in packs) from one hierarchy of labels
+def sunburst_dataframes(items_table, prod_subcat_data, subcat_cat_data, last_label, of_total_texts, lang_dict):
+    packs = items_table['pack'].to_numpy()
+    partial = items_table['partial'].to_numpy()
+    quantity = items_table['quantity'].to_numpy()
+    # the number of packs is integer
+    item_values = pd.DataFrame({
+        'cost' : items_table['cost'].to_numpy(),
+        'cost_items' : 1,
+        'cost_partial' : partial.astype(int),
+        'vol' : np.where(packs, 0, quantity),
+        'vol_items' : (~packs).astype(int),
+        'vol_partial' : (partial & ~packs).astype(int),
+        'pack' : np.where(packs, quantity, 0).round().astype(int),
+        'pack_items' : packs.astype(int),
+        'pack_partial' : (partial & packs).astype(int)
+    }, index=items_table.index)
+    hierarchy, levels = sunburst_hierarchy(item_values, prod_subcat_data, subcat_cat_data, last_label)
 
-## 2.10 Create sunburst plot's layout
+    # displayed labels are the same for all plots ("parent" labels are one level higher)
+    hierarchy['showing_label'] = [
+        showing_label_for_sunburst(label, level) for label, level in zip(hierarchy.index, levels)]
+    hierarchy['showing_parent'] = [
+        showing_label_for_sunburst(parent, level + 1) for parent, level in zip(hierarchy['parent'], levels)]
+    return {
+        graph_type : sunburst_dataframe(hierarchy, levels, of_total_texts[graph_type], graph_type, lang_dict)
+        for graph_type in ['cost', 'vol', 'pack']
+    }
+
+
+## 2.8 Create sunburst plot's layout
 def create_sunburst_object(colorscale='Oranges', **kwargs):
     sunburst = go.Sunburst(
         labels=kwargs['labels'],
@@ -653,7 +623,7 @@ def create_sunburst_object(colorscale='Oranges', **kwargs):
     return sunburst
 
 
-## 2.11 Create items' cost shares plot
+## 2.9 Create items' cost shares plot
 def sunburst_plot_cost(sunburst_table):
     fig = go.Figure(
         create_sunburst_object(
@@ -669,7 +639,7 @@ def sunburst_plot_cost(sunburst_table):
 
     return fig
 
-## 2.12 Create items' quantity shares plot
+## 2.10 Create items' quantity shares plot
 def sunburst_plot_quantity(sunburst_table):
 
     if sunburst_table.shape[0] > 1:
@@ -691,50 +661,16 @@ def sunburst_plot_quantity(sunburst_table):
 
     return fig
 
-## 2.13 Helper function to find all labels for which the current one is the "parent"
-def sunburst_table_slice(label, df, items):
-    sunburst_labels = []
-    if label in items:
-        sunburst_labels.append(label)
-    else:
-        for idx in df[df['parent'] == label].index:
-            sunburst_labels += sunburst_table_slice(idx, df, items)
-        sunburst_labels += [label]
-    return sunburst_labels
-
-## 2.14 Update an items' quantity shares plot
-## based on a click data of the items' cost shares graph
-def update_quantity_sunburst(plot_table, click_data, items):
-    current_label = click_data['points'][0]['label']
-    current_parent = click_data['points'][0]['parent']
-    current_entry = click_data['points'][0].get('entry', '')
-    if current_label in items or current_parent == '':
-        raise PreventUpdate
-    else:
-        if current_label in plot_table['showing_label'].values:
-            working_label = plot_table[plot_table['showing_label'] == current_label].index[0]
-            if current_label != current_entry and current_entry != '':
-                items_slice = sunburst_table_slice(working_label, plot_table, items)
-                slice_data = plot_table.loc[items_slice]
-                slice_data.iloc[-1, [0, 3]] = ''
-            else:
-                if current_parent in plot_table['showing_parent'].values:
-                    working_parent = plot_table[plot_table['showing_label'] == current_parent].index[0]
-                    items_slice = sunburst_table_slice(working_parent, plot_table, items)
-                    slice_data = plot_table.loc[items_slice]
-                    slice_data.iloc[-1, [0, 3]] = ''
-                else:
-                    slice_data = plot_table.copy()
-            return sunburst_plot_quantity(slice_data)
-        elif current_parent in plot_table['showing_parent'].values and\
-            (current_label == current_entry or current_entry == ''):
-            working_parent = plot_table[plot_table['showing_label'] == current_parent].index[0]
-            items_slice = sunburst_table_slice(working_parent, plot_table, items)
-            slice_data = plot_table.loc[items_slice]
-            slice_data.iloc[-1, [0, 3]] = ''
-            return sunburst_plot_quantity(slice_data)
-        else:
-            return sunburst_plot_quantity(plot_table)
+## 2.11 Create an items' quantity shares plot with the data for its synchronization with the items' cost shares plot.
+## The synchronization is done on the client (see assets/sunburst_sync.js): a click on a label shows its subtree,
+## which is the range of points from the start of the subtree (the tree index of the table) to the label itself.
+def sunburst_sync_data(sunburst_table, items, sync_on):
+    return {
+        'figure' : sunburst_plot_quantity(sunburst_table),
+        'subtree_start' : sunburst_table['subtree_start'].tolist(),
+        'items' : items,
+        'sync_on' : sync_on
+    }
 
 # 3. Others expenses table
 ## 3.1 A dataframe if the store kind value is not "All"
@@ -953,57 +889,8 @@ def create_full_datatable(table, hyper_part, super_part, all_part, lang_dict):
     )
     return datatable_object
 
-#4. Items' number by period and Median cost per item by period (update by hover data)
-def update_linear_graph_on_hover(point, df, period_df, start_date_hyper, end_date_hyper, start_date_super, end_date_super, items, lang, sk_value, lang_dict, graph_type):
-    if graph_type == 'medians_count':
-        annotation_text = f'<b>{df.loc[point, 0]:.2f} {lang_dict["rubles"]}</b>'
-    elif graph_type == 'items_count':
-        items_word = lang_dict["items"] + word_ending(lang_dict["items"], df.loc[point, 0])
-        annotation_text = f'<b>{df.loc[point, 0]} {items_word}</b>'
-
-    ANNOTATION = {
-        'x': point,
-        'y' : df.loc[point, 0],
-        'text' : annotation_text,
-        'showarrow' : True,
-        'bgcolor' : '#FFFFFF',
-        'font' : dict(size=16, color='#000000', family='Source Sans Pro, sans-serif'),
-        'borderwidth' : 1,
-        'bordercolor' : '#382250'
-    }
-
-    if period_df.loc[point, 0] == 0:
-        fig = linear_graph(
-            df, period_df, point, point, start_date_super, end_date_super,
-            items, lang, sk_value, lang_dict, graph_type
-        )
-        fig.data = fig.data[:2] + fig.data[3:]
-        fig.layout.shapes = fig.layout.shapes[2:]
-        fig.layout.annotations = fig.layout.annotations[2:]
-        fig.add_annotation(xref='x', yref='y', **ANNOTATION)
-    else:
-        fig = linear_graph(
-            df, period_df, start_date_hyper, end_date_hyper, point, point,
-            items, lang, sk_value, lang_dict, graph_type
-        )
-        if sk_value == lang_dict['store_kind_option_all']:
-            fig.data = fig.data[:5]
-            fig.layout.shapes = [
-                shape for shape in fig.layout.shapes \
-                if shape['yref'] == 'y domain' or shape['opacity'] == 0.65]
-            fig.layout.annotations = [
-                a for a in fig.layout.annotations if a['yref'] == 'y domain'
-            ]
-            fig.add_annotation(xref='x2', yref='y2', **ANNOTATION)
-        else:
-            fig.data = fig.data[:2]
-            fig.layout.shapes = fig.layout.shapes[2:]
-            fig.layout.annotations = []
-            fig.add_annotation(xref='x', yref='y', **ANNOTATION)
-    return fig
-
-# 5. Interrelation between an items' number and a median cost per item
-# 5.1 Create a single scatter plot
+# 4. Interrelation between an items' number and a median cost per item
+# 4.1 Create a single scatter plot
 def one_scatter_graph(fig, df, period_df, scatter_name, legendgroup_name, color, lang_dict, row=1, col=1):
     x_name, y_name = lang_dict['number_of_items'], lang_dict['median_cost_per_item']
     scatter_text = []
@@ -1076,16 +963,11 @@ def one_scatter_graph(fig, df, period_df, scatter_name, legendgroup_name, color,
         )
     return fig
 
-# 5.2 Create a full scatter plot:
+# 4.2 Create a full scatter plot:
 ## If the shop kind value is "All", create two single scatter graphs with the shared y-axis.
-## Draw one single graph in other cases.
-def scatter_graph(df, period_df, sk_value, lang_dict):
-    x = df.apply(np.count_nonzero, axis=1).to_frame()
-    y = df.apply(lambda x: np.median(x[x != 0]) if np.any(x != 0) else 0, axis=1).to_frame()
-    dff = x.join(y, lsuffix='l')
-    dff.columns = ['items', 'median']
-    dff['is_hyper'] = [1 if period_df.loc[i, 0] == 0 else 0 for i in dff.index]
-    dff.drop(dff[(dff['items'] == 0) & (dff['median'] == 0)].index, inplace=True)
+## Draw one single graph in other cases. The number of items and the median cost per item
+## by period are computed by the query engine.
+def scatter_graph(dff, period_df, sk_value, lang_dict):
     hyper_data = dff[dff['is_hyper'] == 1]
     super_data = dff[dff['is_hyper'] == 0]
     if sk_value == lang_dict['store_kind_option_all']:
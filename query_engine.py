@@ -0,0 +1,111 @@
+import math
+import numpy as np
+import pandas as pd
+
+import plot_functions
+
+# Content
+# 1. Query engine
+
+# 1. Query engine:
+## All aggregates of the dashboard for the selected date range, store kind and items are computed
+## by one query: values for the aggregation block, values by period for graphs 1, 5, 6 and 7,
+## values by item for sunburst plots and the other expenses table. The engine works with
+## the translated tables of one language, items are coded by their positions in the tables' columns.
+## Date ranges and sums over periods are taken from the period index.
+class QueryEngine:
+    def __init__(self, index, cost, quantity, cost_others, quantity_others, prod_subcat, subcat_cat, items_dict):
+        self.index = index
+        self.columns = np.array(cost.columns, dtype=object)
+        self.cost_values = cost.to_numpy(dtype=float)
+        self.quantity_values = quantity.to_numpy(dtype=float)
+        self.cost_others = cost_others
+        self.quantity_others = quantity_others
+        self.prod_subcat = prod_subcat
+        self.subcat_cat = subcat_cat
+        self.others_subcategory = items_dict['Остальные расходы']
+        # items measured in packs, other items are measured in kg or l (units are set by the preprocessing)
+        self.packs = (prod_subcat.loc[self.columns, 'unit'] == 'pack').to_numpy()
+
+    ## 1.1. Values by period for all periods: the total cost of items,
+    ## the number of bought items and the median cost of a bought item
+    def by_period(self, items):
+        cost_values = self.cost_values[:, items]
+        counts = self.index.items_counts(items)
+        bought = counts > 0
+        medians = np.zeros(len(counts))
+        if bought.any():
+            values = cost_values[bought]
+            medians[bought] = np.nanmedian(np.where(values != 0, values, np.nan), axis=1)
+        return pd.DataFrame(
+            {'total' : cost_values.sum(axis=1), 'items' : counts, 'median' : medians},
+            index=self.index.dates
+        )
+
+    ## 1.2. Values by item for the periods of the slice: the sums of cost and quantity,
+    ## whether the quantity is unknown for some purchases and whether the item is measured in packs
+    def by_item(self, rows, start, end, store_kind, items):
+        cost_values = self.cost_values[rows][:, items]
+        quantity_values = self.quantity_values[rows][:, items]
+        return pd.DataFrame({
+            'cost' : self.index.range_sum(start, end, store_kind, 'cost')[items],
+            'quantity' : self.index.range_sum(start, end, store_kind, 'quantity')[items],
+            'partial' : ((cost_values != 0) & (quantity_values == 0)).any(axis=0),
+            'pack' : self.packs[items]
+        }, index=self.columns[items])
+
+    ## 1.3. Values of the aggregation block
+    def aggregates(self, start, end, store_kind, items_table):
+        days = int(self.index.range_sum(start, end, store_kind, 'days'))
+        packs = items_table['pack'].to_numpy()
+        quantities = items_table['quantity'].to_numpy()
+        return {
+            'items' : len(items_table),
+            'days' : days,
+            'rub_per_day' : round(items_table['cost'].sum() / days, 2),
+            'vol_per_day' : round(quantities[~packs].sum() / days, 1),
+            'pack_per_day' : int(math.ceil(quantities[packs].sum() / days))
+        }
+
+    ## 1.4. The other expenses table for the periods of the slice
+    ## (items that have not been bought in these periods are dropped)
+    def others_table(self, rows, store_kind):
+        cost_others = self.cost_others.loc[self.index.dates[rows]]
+        cost_others = cost_others.loc[:, (cost_others != 0).any(axis=0)]
+        quantity_others = self.quantity_others.loc[cost_others.index, cost_others.columns]
+        if store_kind == 'all':
+            period_df = pd.DataFrame({0 : self.index.lengths[rows]}, index=self.index.dates[rows])
+            table, hyper_part, super_part, all_part = plot_functions.create_full_table(
+                cost_others, quantity_others, period_df)
+            return {'table' : table, 'hyper_part' : hyper_part, 'super_part' : super_part, 'all_part' : all_part}
+        table, all_part = plot_functions.create_one_table(cost_others, quantity_others)
+        return {'table' : table, 'all_part' : all_part}
+
+    ## 1.5. All aggregates for the date range, the store kind and the list of items' codes.
+    ## Returns None if there are no periods of the store kind in the date range.
+    def query(self, start, end, store_kind, items):
+        items = np.asarray(items, dtype=int)
+        start_pos, end_pos = self.index.bounds(start, end)
+        rows = np.flatnonzero(self.index.masks[store_kind][start_pos:end_pos]) + start_pos
+        if len(rows) == 0:
+            return None
+        periods = self.by_period(items)
+        items_table = self.by_item(rows, start, end, store_kind, items)
+        prod_subcat = self.prod_subcat.loc[items_table.index]
+        subcat_cat = self.subcat_cat.loc[prod_subcat['subcategory'].unique()]
+        # number of items and the median cost for the periods of the slice (periods without purchases are dropped)
+        scatter = periods.iloc[rows][['items', 'median']]
+        scatter.insert(2, 'is_hyper', (self.index.lengths[rows] == 0).astype(int))
+        scatter = scatter[(scatter['items'] != 0) | (scatter['median'] != 0)]
+        result = {
+            'range' : [self.index.dates[rows[0]], self.index.dates[rows[-1]]],
+            'aggregates' : self.aggregates(start, end, store_kind, items_table),
+            'by_period' : periods,
+            'scatter' : scatter,
+            'by_item' : items_table,
+            'prod_subcat' : prod_subcat,
+            'subcat_cat' : subcat_cat
+        }
+        if self.others_subcategory in subcat_cat.index:
+            result['others'] = self.others_table(rows, store_kind)
+        return result
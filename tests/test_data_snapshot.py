@@ -0,0 +1,58 @@
+import io
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_preprocessing
+import data_snapshot
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'Products.csv')
+# Number of the sheet's columns in the previous version of the sheet
+PREVIOUS_COLUMNS = 310
+
+# Helper function to get the content of the sheet with the first columns
+def sheet_content(df, columns=None):
+    df = df if columns is None else df.iloc[:, :columns]
+    return df.to_csv(sep=';', index=False).encode('utf-8')
+
+# Helper function to check that the tables are the same as the tables of the full preprocessing
+def assert_full_preprocessing(tables, csv_content):
+    df = pd.read_csv(io.BytesIO(csv_content), delimiter=';')
+    expected = data_preprocessing.data_preprocessing(df)
+    for table, expected_table in zip(tables, expected):
+        pd.testing.assert_frame_equal(table, expected_table, check_freq=False)
+
+# Helper function to load a snapshot of the previous version of the sheet and then the current version
+# (returns the tables, the current content and whether the new columns have been appended)
+def load_two_versions(tmp_path, monkeypatch, df_previous, df_current):
+    monkeypatch.setattr(data_snapshot, 'SNAPSHOT_DIR', str(tmp_path))
+    data_snapshot.load_tables(sheet_content(df_previous, PREVIOUS_COLUMNS))
+    appended = []
+    append_new_columns = data_snapshot.append_new_columns
+    def spy(*args):
+        result = append_new_columns(*args)
+        appended.append(result is not None)
+        return result
+    monkeypatch.setattr(data_snapshot, 'append_new_columns', spy)
+    csv_content = sheet_content(df_current)
+    return data_snapshot.load_tables(csv_content), csv_content, appended
+
+# New columns are appended to the previous snapshot
+def test_append_new_columns(tmp_path, monkeypatch):
+    df = pd.read_csv(DATA_FILE, delimiter=';')
+    tables, csv_content, appended = load_two_versions(tmp_path, monkeypatch, df, df)
+    assert appended == [True]
+    assert_full_preprocessing(tables, csv_content)
+
+# An edit of an existing column together with new columns needs the full preprocessing
+def test_edit_and_append_columns(tmp_path, monkeypatch):
+    df = pd.read_csv(DATA_FILE, delimiter=';')
+    edited = df.copy()
+    row = edited.index[edited.iloc[:, 1].astype(str).str.strip() == 'Йогурт'][0]
+    edited.loc[row, '07.03.2021 - 12.03.2021'] = '999'
+    tables, csv_content, appended = load_two_versions(tmp_path, monkeypatch, df, edited)
+    assert appended == [False]
+    assert_full_preprocessing(tables, csv_content)
+    assert tables[2].loc['2021-03-12', 'Йогурт'] == 999.0